@@ -0,0 +1,330 @@
+"""Benchmarks of the clock generator, runnable without KiCad.
+
+The benchmarks use the pcbnew stand-in next to this file instead of KiCad. They time
+the geometry helpers, the full generation of the checked-in board with both backends
+and the routing of a growing number of rings. The generated geometry is compared
+against a golden snapshot, so a speedup cannot silently change the routing, and the
+profile of a generation has to count the board API calls of saving the tracks. Boards
+with more clock positions have to pass the design rule and connectivity checks.
+
+Example::
+
+    python benchmarks/benchmark_StudioClock.py --json benchmark.json
+    python benchmarks/benchmark_StudioClock.py --update-golden  # after wanted changes
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPOSITORY_DIR = os.path.dirname(BENCHMARK_DIR)
+# the stand-in pcbnew of this directory shadows an installed KiCad
+sys.path[:0] = [BENCHMARK_DIR, REPOSITORY_DIR]
+
+import board_checks  # noqa: E402
+import clock_geometry  # noqa: E402
+import kicad_pcb_parser  # noqa: E402
+import make_StudioClock  # noqa: E402
+import pcbnew  # noqa: E402
+import profiling  # noqa: E402
+from routing_plan import RoutingPlan  # noqa: E402
+
+BOARD_PATH = os.path.join(REPOSITORY_DIR, "StudioClock.kicad_pcb")
+GOLDEN_PATH = os.path.join(BENCHMARK_DIR, "golden_StudioClock.json")
+#: board API calls the profile of the save phase has to report (partly inherited)
+SAVE_PHASE_CALLS = (
+    "TRACK.SetStart",
+    "TRACK.SetEnd",
+    "TRACK.SetNetCode",
+    "TRACK.SetLayer",
+    "TRACK.SetWidth",
+    "VIA.SetNetCode",
+    "VIA.SetWidth",
+)
+#: clock positions of the boards which have to be routed without violations
+ROUTED_POSITIONS = (120,)
+#: clock positions of the boards generate_board() has to refuse (no space for tracks)
+REFUSED_POSITIONS = (240,)
+#: number of rings of the scaled ring benchmark
+RING_COUNTS = (15, 60, 240)
+
+
+def measure(function, repeat=5, number=1):
+    """Time a function like timeit, the first call is not timed (warm up).
+
+    :param function: callable without arguments
+    :param int repeat: number of timed runs
+    :param int number: calls per run
+    :return dict: best and median time per call (s)
+    """
+    function()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        times.append((time.perf_counter() - start) / number)
+    return {"best_s": min(times), "median_s": statistics.median(times)}
+
+
+def generate(backend, output_path):
+    """Load, generate and save the checked-in board.
+
+    :param str backend: "pcbnew" (stand-in) or "sexpr"
+    :param str output_path: .kicad_pcb file to write
+    :return: the saved board
+    """
+    board = make_StudioClock.load_board(BOARD_PATH, backend)
+    plan, placements = make_StudioClock.generate_board(board)
+    make_StudioClock.save_board(board, plan, placements, output_path, backend)
+    return board
+
+
+def _digest(rows):
+    return hashlib.sha256(repr(sorted(rows)).encode()).hexdigest()
+
+
+def snapshot(board):
+    """Summarize the geometry of a board saved by the pcbnew stand-in.
+
+    :param pcbnew.BOARD board:
+    :return dict: object counts and digests of the sorted objects
+    """
+    tracks = board.GetTracks()
+    segments = [
+        (*t.start, *t.end, t.layer, t.net_code, t.width)
+        for t in tracks
+        if not isinstance(t, pcbnew.VIA)
+    ]
+    vias = [
+        (*t.start, t.net_code, t.width, t.drill)
+        for t in tracks
+        if isinstance(t, pcbnew.VIA)
+    ]
+    drawings = [(*d.start, *d.end, d.layer, d.width) for d in board.GetDrawings()]
+    modules = [
+        (m.GetReference(), *m.GetPosition(), m.GetOrientation())
+        for m in board.GetModules()
+    ]
+    return {
+        "segments": len(segments),
+        "vias": len(vias),
+        "drawings": len(drawings),
+        "modules": len(modules),
+        "segments_sha256": _digest(segments),
+        "vias_sha256": _digest(vias),
+        "drawings_sha256": _digest(drawings),
+        "modules_sha256": _digest(modules),
+    }
+
+
+def route_rings(count):
+    """Route a number of concentric rings with their vias.
+
+    :param int count: number of rings
+    :return RoutingPlan:
+    """
+    plan = RoutingPlan({"F.Cu": 0, "B.Cu": 31})
+    for number in range(count):
+        radius = 10 + number * 0.75
+        make_StudioClock.add_track_ring(plan, radius, number + 1, plan.layer("B.Cu"))
+        via = make_StudioClock.get_ring_intersection_by_position(radius, number % 60)
+        make_StudioClock.add_via(plan, via, number + 1)
+    return plan
+
+
+def scaled_board(positions):
+    """Load the board with each second LED repeated up to a number of clock positions.
+
+    The repeated LEDs have the nets of the LED they repeat, the hour and separation
+    LEDs follow them in the order of the references.
+
+    :param int positions: multiple of the clock positions of the board
+    :return kicad_pcb_parser.KicadPcb:
+    """
+    board = kicad_pcb_parser.load_board(BOARD_PATH)
+    factor = positions // clock_geometry.CLOCK_POSITIONS
+    modules = {}
+
+    def add(module, reference):
+        copy = kicad_pcb_parser.Module(
+            len(modules), reference, module.position, module.orientation
+        )
+        copy.pads = [
+            kicad_pcb_parser.Pad(copy, pad.name, pad.local_position, pad.net)
+            for pad in module.pads
+        ]
+        modules[reference] = copy
+
+    for module in sorted(board.modules.values()):
+        prefix, number = make_StudioClock.regex_split_annotation(module.reference)
+        if prefix != "D":
+            add(module, module.reference)
+        elif number <= clock_geometry.CLOCK_POSITIONS:
+            for i in range(factor):
+                add(module, f"D{(number - 1) * factor + i + 1}")
+        else:
+            add(module, f"D{number - clock_geometry.CLOCK_POSITIONS + positions}")
+    board.modules.clear()
+    board.modules.update(modules)
+    return board
+
+
+def check_positions():
+    """Check the routing of boards with more clock positions with board_checks.
+
+    :return list of str: problems found
+    """
+    problems = []
+    for positions in ROUTED_POSITIONS:
+        plan, _ = make_StudioClock.generate_board(
+            scaled_board(positions), positions=positions
+        )
+        violations = board_checks.check_clearance(plan)
+        open_nets = board_checks.check_connectivity(
+            plan, board_checks.group_pads_by_net(plan.pads)
+        )
+        if violations or open_nets:
+            problems.append(
+                f"{positions} positions: {len(violations)} clearance violations, "
+                f"open nets {[net.name for net in open_nets]}"
+            )
+    for positions in REFUSED_POSITIONS:
+        try:
+            make_StudioClock.generate_board(
+                scaled_board(positions), positions=positions
+            )
+        except ValueError:
+            continue
+        problems.append(f"{positions} positions are routed instead of refused")
+    return problems
+
+
+def run_benchmarks(output_dir, repeat=5):
+    """Run all benchmarks.
+
+    :param str output_dir: directory for the generated boards
+    :param int repeat: number of timed runs per benchmark
+    :return dict: benchmark name -> timing
+    """
+    # two pads of the first net of the first digit (connected by digit_u_connect)
+    board = pcbnew.LoadBoard(BOARD_PATH)
+    digit = next(m for m in board.GetModules() if m.GetReference() == "U1")
+    net_code = digit.Pads()[0].GetNetCode()
+    pad_a, pad_b = [p for p in board.GetPads() if p.GetNetCode() == net_code][:2]
+    plan = RoutingPlan({"F.Cu": 0, "B.Cu": 31})
+    results = {
+        "add_track_arc": measure(
+            lambda: make_StudioClock.add_track_arc(plan, 40.5, 2.5, 57.5, 1, 0),
+            repeat,
+            100,
+        ),
+        # the geometry itself (the memoization bypassed) and a memoized call
+        "get_ring_intersection": measure(
+            lambda: make_StudioClock.get_ring_intersection.__wrapped__(40.5, 0.3, 1),
+            repeat,
+            1000,
+        ),
+        "get_ring_intersection_cached": measure(
+            lambda: make_StudioClock.get_ring_intersection(40.5, 0.3, 1),
+            repeat,
+            1000,
+        ),
+        "digit_u_connect": measure(
+            lambda: make_StudioClock.digit_u_connect(plan, pad_a, pad_b, -2),
+            repeat,
+            100,
+        ),
+    }
+    for backend in ("pcbnew", "sexpr"):
+        output_path = os.path.join(output_dir, f"StudioClock_{backend}.kicad_pcb")
+        results[f"generate_{backend}"] = measure(
+            lambda: generate(backend, output_path), repeat
+        )
+    for count in RING_COUNTS:
+        results[f"route_{count}_rings"] = measure(lambda: route_rings(count), repeat)
+    return results
+
+
+def check_golden(output_dir, update=False):
+    """Compare the geometry generated with the pcbnew stand-in to the golden snapshot.
+
+    :param str output_dir: directory for the generated board
+    :param bool update: store the current geometry as new snapshot
+    :return list of str: differing keys of the snapshot
+    """
+    current = snapshot(
+        generate("pcbnew", os.path.join(output_dir, "StudioClock_golden.kicad_pcb"))
+    )
+    if update:
+        with open(GOLDEN_PATH, "w") as f:
+            json.dump(current, f, indent=1)
+            f.write("\n")
+        return []
+    with open(GOLDEN_PATH) as f:
+        golden = json.load(f)
+    return [key for key in golden if golden[key] != current.get(key)]
+
+
+def check_profile(output_dir):
+    """Check that the profiler counts the board API calls of the save phase.
+
+    :param str output_dir: directory for the generated board
+    :return list of str: calls of SAVE_PHASE_CALLS missing in the report
+    """
+    profiler = profiling.enable("pcbnew")
+    try:
+        generate("pcbnew", os.path.join(output_dir, "StudioClock_profile.kicad_pcb"))
+        profiler.end_phase()
+        report = profiler.report()
+    finally:
+        profiler.enabled = False
+        profiler.restore()
+        profiler.phases.clear()
+    calls = next(p["calls"] for p in report["phases"] if p["name"] == "save")
+    return [name for name in SAVE_PHASE_CALLS if not calls.get(name)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="write the timings to this JSON file")
+    parser.add_argument("--update-golden", action="store_true")
+    parser.add_argument("--golden-only", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        differences = check_golden(output_dir, args.update_golden)
+        if differences:
+            print(
+                f"geometry differs from the golden snapshot: {', '.join(differences)}"
+            )
+            sys.exit(1)
+        print("geometry matches the golden snapshot")
+        missing = check_profile(output_dir)
+        if missing:
+            print(f"profile of the save phase misses: {', '.join(missing)}")
+            sys.exit(1)
+        problems = check_positions()
+        if problems:
+            print(f"routing of more clock positions: {'; '.join(problems)}")
+            sys.exit(1)
+        if args.golden_only:
+            sys.exit(0)
+        timings = run_benchmarks(output_dir, args.repeat)
+    for name, timing in timings.items():
+        print(
+            f"{name:28} best {timing['best_s'] * 1e3:9.3f} ms"
+            f"   median {timing['median_s'] * 1e3:9.3f} ms"
+        )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(
+                {"python_version": sys.version.split()[0], **timings}, f, indent=1
+            )
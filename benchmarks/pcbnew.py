@@ -0,0 +1,352 @@
+"""Lightweight in-process stand-in for the KiCad 5 ``pcbnew`` module.
+
+Only the part of the API used by make_StudioClock.py is provided. Boards are read with
+kicad_pcb_parser (plus the old tracks, vias and graphic lines, so deleting them costs
+like in pcbnew and kept drawings are saved again) and saved with kicad_pcb_writer, so
+the generator runs on machines without KiCad. Like pcbnew, ``BOARD.Add`` inserts tracks
+and vias at the head of the track list, which makes ``GetTracks`` return them in reverse
+order of creation.
+
+This module shadows the real pcbnew, it is only put on the path by the benchmarks.
+"""
+
+import re
+
+import kicad_pcb_parser
+import kicad_pcb_writer
+from clock_geometry import IU_PER_MM
+from routing_plan import RoutingPlan
+
+VIA_THROUGH = 3
+PCB_LINE_T = 6
+PCB_TRACE_T = 10
+PCB_VIA_T = 11
+
+_RE_SEGMENT = re.compile(
+    r"^  \(segment \(start (\S+) (\S+)\) \(end (\S+) (\S+)\) \(width (\S+)\) "
+    r"\(layer (\S+)\) \(net (\d+)\)",
+    re.M,
+)
+_RE_GR_LINE = re.compile(
+    r"^  \(gr_line \(start (\S+) (\S+)\) \(end (\S+) (\S+)\)(?: \(angle \S+\))? "
+    r"\(layer (\S+)\) \(width ([^\s)]+)\)",
+    re.M,
+)
+_RE_VIA = re.compile(
+    r"^  \(via \(at (\S+) (\S+)\) \(size (\S+)\) \(drill (\S+)\) .*\(net (\d+)\)",
+    re.M,
+)
+
+
+def FromMM(mm):  # noqa
+    return int(mm * IU_PER_MM)
+
+
+def ToMM(iu):  # noqa
+    return iu / IU_PER_MM
+
+
+def GetBuildVersion():  # noqa
+    return "mock"
+
+
+class wxPoint:  # noqa
+    """Integer point with x and y attribute, indexable like the SWIG wrapper."""
+
+    __slots__ = ("x", "y")
+
+    def __init__(self, x=0, y=0):
+        self.x = int(x)
+        self.y = int(y)
+
+    def __getitem__(self, index):
+        return (self.x, self.y)[index]
+
+    def __len__(self):
+        return 2
+
+    def __eq__(self, other):
+        return (self.x, self.y) == (other[0], other[1])
+
+    def __repr__(self):
+        return f"wxPoint({self.x}, {self.y})"
+
+
+def wxPointMM(mmx, mmy):  # noqa
+    return wxPoint(FromMM(mmx), FromMM(mmy))
+
+
+class NETINFO_ITEM:  # noqa
+    def __init__(self, code, name):
+        self.code = code
+        self.name = name
+
+    def GetNet(self):  # noqa
+        return self.code
+
+    def GetNetCode(self):  # noqa
+        return self.code
+
+    def GetNetname(self):  # noqa
+        return self.name
+
+    def GetShortNetname(self):  # noqa
+        return self.name.rsplit("/", 1)[-1]
+
+
+class D_PAD:  # noqa
+    def __init__(self, parent, name, local_position, net):
+        self.parent = parent
+        self.name = name
+        self.local_position = local_position
+        self.net = net
+
+    def GetParent(self):  # noqa
+        return self.parent
+
+    def GetPadName(self):  # noqa
+        return self.name
+
+    def GetNet(self):  # noqa
+        return self.net
+
+    def GetNetCode(self):  # noqa
+        return self.net.code
+
+    def GetShortNetname(self):  # noqa
+        return self.net.GetShortNetname()
+
+    def GetPosition(self):  # noqa
+        x, y = kicad_pcb_parser.rotate_point(
+            *self.local_position, self.parent.orientation
+        )
+        return wxPoint(x + self.parent.position.x, y + self.parent.position.y)
+
+
+class MODULE:  # noqa
+    def __init__(self, index, reference, position, orientation):
+        self.index = index
+        self.reference = reference
+        self.position = position
+        self.orientation = orientation
+        self.pads = []
+
+    def __lt__(self, other):
+        return self.index < other.index
+
+    def GetReference(self):  # noqa
+        return self.reference
+
+    def GetPosition(self):  # noqa
+        return self.position
+
+    def SetPosition(self, position):  # noqa
+        self.position = wxPoint(position[0], position[1])
+
+    def GetOrientation(self):  # noqa
+        return self.orientation
+
+    def SetOrientation(self, orientation):  # noqa
+        self.orientation = orientation
+
+    def Pads(self):  # noqa
+        return list(self.pads)
+
+
+class BOARD_ITEM:  # noqa
+    TYPE = None
+
+    def __init__(self, board=None):
+        self.board = board
+        self.net_code = 0
+        self.layer = 0
+        self.width = 0
+        self.start = wxPoint()
+        self.end = wxPoint()
+
+    def Type(self):  # noqa
+        return self.TYPE
+
+    def GetNetCode(self):  # noqa
+        return self.net_code
+
+    def SetNetCode(self, net_code):  # noqa
+        self.net_code = net_code
+
+    def GetLayer(self):  # noqa
+        return self.layer
+
+    def SetLayer(self, layer):  # noqa
+        self.layer = layer
+
+    def GetWidth(self):  # noqa
+        return self.width
+
+    def SetWidth(self, width):  # noqa
+        self.width = width
+
+    def GetStart(self):  # noqa
+        return self.start
+
+    def SetStart(self, start):  # noqa
+        self.start = wxPoint(*start)
+
+    def GetEnd(self):  # noqa
+        return self.end
+
+    def SetEnd(self, end):  # noqa
+        self.end = wxPoint(*end)
+
+
+class TRACK(BOARD_ITEM):  # noqa
+    TYPE = PCB_TRACE_T
+
+
+class VIA(TRACK):  # noqa
+    TYPE = PCB_VIA_T
+
+    def __init__(self, board=None):
+        super().__init__(board)
+        self.drill = 0
+        self.via_type = VIA_THROUGH
+        self.layer_pair = (0, 31)
+
+    def GetPosition(self):  # noqa
+        return self.start
+
+    def SetPosition(self, position):  # noqa
+        self.start = self.end = wxPoint(*position)
+
+    def SetDrill(self, drill):  # noqa
+        self.drill = drill
+
+    def SetViaType(self, via_type):  # noqa
+        self.via_type = via_type
+
+    def SetLayerPair(self, top, bottom):  # noqa
+        self.layer_pair = (top, bottom)
+
+
+class DRAWSEGMENT(BOARD_ITEM):  # noqa
+    TYPE = PCB_LINE_T
+
+
+class BOARD:  # noqa
+    def __init__(self, path=""):
+        self.path = path
+        self.layer_table = dict(kicad_pcb_parser.DEFAULT_LAYER_NAMES)
+        self.nets = {}
+        self.modules = []
+        self.tracks = []
+        self.drawings = []
+
+    def BuildListOfNets(self):  # noqa
+        pass
+
+    def GetFileName(self):  # noqa
+        return self.path
+
+    def GetLayerName(self, num):  # noqa
+        return self.layer_table.get(num, "")
+
+    def GetLayerID(self, name):  # noqa
+        return {name: num for num, name in self.layer_table.items()}.get(name, -1)
+
+    def GetModules(self):  # noqa
+        return list(self.modules)
+
+    def GetPads(self):  # noqa
+        return [pad for module in self.modules for pad in module.pads]
+
+    def GetTracks(self):  # noqa
+        return list(self.tracks)
+
+    def GetDrawings(self):  # noqa
+        return list(self.drawings)
+
+    def Add(self, item):  # noqa
+        if isinstance(item, DRAWSEGMENT):
+            self.drawings.append(item)
+        else:
+            self.tracks.insert(0, item)
+
+    def Delete(self, item):  # noqa
+        self.tracks.remove(item)
+
+    def Remove(self, item):  # noqa
+        self.drawings.remove(item)
+
+    def Save(self, path):  # noqa
+        """Write the modules, tracks, vias and drawings into a copy of the file."""
+        plan = RoutingPlan({name: num for num, name in self.layer_table.items()})
+        for track in reversed(self.tracks):
+            if isinstance(track, VIA):
+                plan.add_via(track.start, track.net_code, track.width, track.drill)
+            else:
+                plan.add_segment(
+                    track.start, track.end, track.net_code, track.layer, track.width
+                )
+        for drawing in self.drawings:
+            plan.add_drawing(drawing.start, drawing.end, drawing.layer, drawing.width)
+        placements = {
+            module.reference: (module.position, module.orientation)
+            for module in self.modules
+        }
+        kicad_pcb_writer.write_board(self.path, path, plan, placements)
+        return True
+
+
+def _to_nm(value):
+    return round(float(value) * IU_PER_MM)
+
+
+def LoadBoard(path):  # noqa
+    """Load a board file.
+
+    :param str path: .kicad_pcb file
+    :return BOARD:
+    """
+    board = BOARD(path)
+    with kicad_pcb_parser.load_board(path) as parsed:
+        board.layer_table = dict(parsed.layer_table)
+        board.nets = {
+            code: NETINFO_ITEM(code, net.name) for code, net in parsed.nets.items()
+        }
+        for parsed_module in parsed.GetModules():
+            module = MODULE(
+                parsed_module.index,
+                parsed_module.reference,
+                wxPoint(*parsed_module.position),
+                parsed_module.orientation,
+            )
+            module.pads = [
+                D_PAD(module, pad.name, pad.local_position, board.nets[pad.net.code])
+                for pad in parsed_module.pads
+            ]
+            board.modules.append(module)
+    layer_table_rev = {name: num for num, name in board.layer_table.items()}
+    with open(path) as f:
+        text = f.read()
+    for x0, y0, x1, y1, width, layer, net_code in _RE_SEGMENT.findall(text):
+        track = TRACK(board)
+        track.SetStart((_to_nm(x0), _to_nm(y0)))
+        track.SetEnd((_to_nm(x1), _to_nm(y1)))
+        track.SetWidth(_to_nm(width))
+        track.SetLayer(layer_table_rev[layer])
+        track.SetNetCode(int(net_code))
+        board.Add(track)
+    for x, y, size, drill, net_code in _RE_VIA.findall(text):
+        via = VIA(board)
+        via.SetPosition((_to_nm(x), _to_nm(y)))
+        via.SetWidth(_to_nm(size))
+        via.SetDrill(_to_nm(drill))
+        via.SetNetCode(int(net_code))
+        board.Add(via)
+    for x0, y0, x1, y1, layer, width in _RE_GR_LINE.findall(text):
+        drawing = DRAWSEGMENT(board)
+        drawing.SetStart((_to_nm(x0), _to_nm(y0)))
+        drawing.SetEnd((_to_nm(x1), _to_nm(y1)))
+        drawing.SetLayer(layer_table_rev[layer])
+        drawing.SetWidth(_to_nm(width))
+        board.Add(drawing)
+    return board
@@ -0,0 +1,208 @@
+"""Content addressed on-disk cache of generated boards.
+
+The key of a board is a hash of the input board content (modules, nets, layers and
+setup, without the tracks, vias and drawings the generator replaces), the parameters
+of make_StudioClock.generate_board() with their defaults (and the content of the
+netlist they name), the backend and the source of the generator. On a hit the cached
+board, its net fingerprints and its routing plan are returned without loading,
+routing or saving. The store is bounded in size, the
+least recently used entries are evicted first.
+
+Every entry consists of three files in the cache directory::
+
+    <key>.kicad_pcb  <key>.kicad_pcb.fingerprints.json  <key>.npz
+"""
+
+import collections
+import contextlib
+import functools
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import sys
+
+import kicad_pcb_parser
+import kicad_pcb_writer
+import net_fingerprints
+from routing_plan import RoutingPlan
+
+#: default size limit of the cache directory (bytes)
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+#: top level items of the input board which do not affect the generated board
+IGNORED_ITEMS = ("general", *kicad_pcb_writer.REPLACED_ITEMS)
+
+
+def generator_sources():
+    """Find the source files of the repository modules the generator imports.
+
+    The module level imports of make_StudioClock are followed recursively (modules
+    and objects imported from modules), lazy imports of the command line are not.
+
+    :return list of str: paths of the .py files, sorted
+    """
+    import make_StudioClock
+
+    directory = os.path.dirname(os.path.abspath(__file__))
+    sources = {}
+    pending = [make_StudioClock]
+    while pending:
+        module = pending.pop()
+        path = getattr(module, "__file__", None)
+        if path is None or os.path.dirname(os.path.abspath(path)) != directory:
+            continue  # standard library, numpy, pcbnew, ...
+        if path in sources:
+            continue
+        sources[path] = module
+        for value in vars(module).values():
+            if not inspect.ismodule(value):
+                value = sys.modules.get(getattr(value, "__module__", None) or "")
+            if value is not None:
+                pending.append(value)
+    return sorted(sources)
+
+
+@functools.lru_cache(maxsize=None)
+def generator_version():
+    """Hash the source of the generator (see generator_sources()).
+
+    :return str: sha256 hex digest
+    """
+    digest = hashlib.sha256()
+    for path in generator_sources():
+        digest.update(os.path.basename(path).encode())
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def board_parameters(parameters):
+    """Complete keyword arguments of generate_board() with the defaults.
+
+    :param dict parameters: keyword arguments of make_StudioClock.generate_board()
+    :return dict: all parameters except the board
+    """
+    import make_StudioClock
+
+    bound = inspect.signature(make_StudioClock.generate_board).bind_partial(
+        **parameters
+    )
+    bound.apply_defaults()
+    return {name: value for name, value in bound.arguments.items() if name != "pcb"}
+
+
+class BoardCache:
+    """Size bounded store of generated boards with LRU eviction.
+
+    :param str directory: cache directory, created if missing
+    :param int max_bytes: size limit of all entries
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, template_path, parameters, backend="pcbnew"):
+        """Get the key of a generated board.
+
+        :param str template_path: input .kicad_pcb file
+        :param dict parameters: keyword arguments of make_StudioClock.generate_board()
+        :param str backend: "pcbnew" or "sexpr" (the formatting of the files differs)
+        :return str: sha256 hex digest
+        """
+        with kicad_pcb_parser.load_board(template_path) as pcb:
+            content = pcb.content_digest(exclude=IGNORED_ITEMS)
+        digest = hashlib.sha256(content.encode())
+        digest.update(
+            json.dumps(
+                board_parameters(parameters), sort_keys=True, default=repr
+            ).encode()
+        )
+        if parameters.get("netlist"):
+            with open(parameters["netlist"], "rb") as f:
+                digest.update(f.read())
+        digest.update(backend.encode())
+        digest.update(generator_version().encode())
+        return digest.hexdigest()
+
+    def _path(self, key, suffix):
+        return os.path.join(self.directory, f"{key}{suffix}")
+
+    def fetch(self, key, output_path):
+        """Copy a cached board (and its fingerprints) to the output path.
+
+        :param str key: as returned by :meth:`key`
+        :param str output_path: .kicad_pcb file to write
+        :return RoutingPlan: the routing plan of the board, None if not cached
+        """
+        board_path = self._path(key, ".kicad_pcb")
+        try:
+            plan = RoutingPlan.load(self._path(key, ".npz"))
+            _copy(board_path, output_path)
+            _copy(
+                net_fingerprints.sidecar_path(board_path),
+                net_fingerprints.sidecar_path(output_path),
+            )
+            os.utime(board_path)  # most recently used
+        except (OSError, ValueError):
+            return None  # missing or evicted meanwhile
+        return plan
+
+    def store(self, key, output_path, plan):
+        """Add a saved board to the cache and evict the least recently used boards.
+
+        :param str key: as returned by :meth:`key`
+        :param str output_path: .kicad_pcb file saved by make_StudioClock.save_board()
+        :param RoutingPlan plan: routing plan of the board
+        :return None:
+        """
+        board_path = self._path(key, ".kicad_pcb")
+        tmp_path = f"{self._path(key, '.npz')}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            plan.save(f)
+        os.replace(tmp_path, self._path(key, ".npz"))
+        _copy(
+            net_fingerprints.sidecar_path(output_path),
+            net_fingerprints.sidecar_path(board_path),
+        )
+        _copy(output_path, board_path)  # last, an entry is complete with its board
+        self.evict()
+
+    def evict(self):
+        """Remove the least recently used entries until the size limit is kept.
+
+        :return list of str: keys of the removed entries
+        """
+        entries = collections.defaultdict(lambda: [0, 0.0, []])  # size, mtime, files
+        with os.scandir(self.directory) as it:
+            for item in it:
+                if item.name.endswith(".tmp") or not item.is_file():
+                    continue
+                try:
+                    stat = item.stat()
+                except FileNotFoundError:
+                    continue
+                entry = entries[item.name.split(".", 1)[0]]
+                entry[0] += stat.st_size
+                entry[2].append(item.path)
+                if item.name.endswith(".kicad_pcb"):
+                    entry[1] = stat.st_mtime
+        total = sum(size for size, _, _ in entries.values())
+        removed = []
+        for key, (size, _, files) in sorted(entries.items(), key=lambda e: e[1][1]):
+            if total <= self.max_bytes:
+                break
+            for path in sorted(files, key=lambda p: not p.endswith(".kicad_pcb")):
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(path)
+            total -= size
+            removed.append(key)
+        return removed
+
+
+def _copy(source, destination):
+    tmp_path = f"{destination}.{os.getpid()}.tmp"
+    shutil.copyfile(source, tmp_path)
+    os.replace(tmp_path, destination)
@@ -0,0 +1,279 @@
+"""Design rule and connectivity checks of a generated routing plan without KiCad.
+
+The objects of the plan are put into a uniform grid per copper layer, so only objects
+sharing a grid cell are compared and the checks run in near linear time instead of
+comparing all pairs.
+
+Example (checks the default clock, exit code 1 if there are violations or open nets)::
+
+    python board_checks.py StudioClock.kicad_pcb
+"""
+
+import collections
+import math
+import sys
+
+#: minimal distance between the copper of different nets (trace_clearance of the board)
+CLEARANCE = 200000
+#: edge length of the grid cells (nm)
+CELL_SIZE = 2000000
+#: distance (nm) a track end may lie beside the copper it connects to (rounding)
+CONNECT_TOLERANCE = 1000
+
+ClearanceViolation = collections.namedtuple(
+    "ClearanceViolation", ("layer", "first", "second", "gap")
+)
+OpenNet = collections.namedtuple("OpenNet", ("name", "components", "dangling"))
+
+
+class _Grid:
+    """Uniform grid of items with an axis aligned bounding box.
+
+    :param int cell_size: edge length of the cells (nm)
+    """
+
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.cells = collections.defaultdict(list)
+
+    def _cells(self, x0, y0, x1, y1):
+        size = self.cell_size
+        for ix in range(math.floor(x0 / size), math.floor(x1 / size) + 1):
+            for iy in range(math.floor(y0 / size), math.floor(y1 / size) + 1):
+                yield ix, iy
+
+    def insert(self, item, box):
+        """Add an item to all cells its box (x0, y0, x1, y1) overlaps."""
+        for cell in self._cells(*box):
+            self.cells[cell].append(item)
+
+    def query(self, box):
+        """Iterate over the items of all cells the box overlaps (may repeat items)."""
+        for cell in self._cells(*box):
+            yield from self.cells.get(cell, ())
+
+
+class _UnionFind:
+    """Disjoint sets of the integers 0 .. size - 1 (path halving)."""
+
+    def __init__(self, size):
+        self.parent = list(range(size))
+
+    def find(self, item):
+        while self.parent[item] != item:
+            self.parent[item] = self.parent[self.parent[item]]
+            item = self.parent[item]
+        return item
+
+    def union(self, first, second):
+        self.parent[self.find(first)] = self.find(second)
+
+
+def _box(x0, y0, x1, y1, margin):
+    return (
+        min(x0, x1) - margin,
+        min(y0, y1) - margin,
+        max(x0, x1) + margin,
+        max(y0, y1) + margin,
+    )
+
+
+def point_segment_distance(px, py, x0, y0, x1, y1):
+    """Distance of a point to a line segment.
+
+    :return float:
+    """
+    dx = x1 - x0
+    dy = y1 - y0
+    length2 = dx * dx + dy * dy
+    if length2 == 0:
+        return math.hypot(px - x0, py - y0)
+    t = max(0.0, min(1.0, ((px - x0) * dx + (py - y0) * dy) / length2))
+    return math.hypot(px - x0 - t * dx, py - y0 - t * dy)
+
+
+def _cross(ax, ay, bx, by, cx, cy):
+    return (bx - ax) * (cy - ay) - (by - ay) * (cx - ax)
+
+
+def segment_distance(a, b):
+    """Distance between two line segments given as (x0, y0, x1, y1).
+
+    :return float: 0 if they intersect
+    """
+    d1 = _cross(*b[:2], *b[2:], *a[:2])
+    d2 = _cross(*b[:2], *b[2:], *a[2:])
+    d3 = _cross(*a[:2], *a[2:], *b[:2])
+    d4 = _cross(*a[:2], *a[2:], *b[2:])
+    if ((d1 > 0 > d2) or (d1 < 0 < d2)) and ((d3 > 0 > d4) or (d3 < 0 < d4)):
+        return 0.0
+    return min(
+        point_segment_distance(*a[:2], *b),
+        point_segment_distance(*a[2:], *b),
+        point_segment_distance(*b[:2], *a),
+        point_segment_distance(*b[2:], *a),
+    )
+
+
+def _copper_shapes(plan):
+    """Get the copper of the plan per layer as (object, centre line, half width).
+
+    Vias are through vias and occupy every copper layer with tracks and F.Cu / B.Cu.
+    """
+    shapes = collections.defaultdict(list)
+    for segment in plan.iter_segments():
+        line = (*segment.start, *segment.end)
+        shapes[segment.layer].append((segment, line, segment.width / 2))
+    via_layers = {plan.layer("F.Cu"), plan.layer("B.Cu"), *shapes}
+    for via in plan.iter_vias():
+        line = (*via.position, *via.position)
+        for layer in via_layers:
+            shapes[layer].append((via, line, via.width / 2))
+    return shapes
+
+
+def check_clearance(plan, clearance=CLEARANCE, cell_size=CELL_SIZE):
+    """Find copper of different nets closer than the clearance.
+
+    :param routing_plan.RoutingPlan plan: generated tracks and vias
+    :param int clearance: minimal distance between copper of different nets (nm)
+    :param int cell_size: edge length of the grid cells (nm)
+    :return list of ClearanceViolation: gap is the distance of the copper (nm),
+        negative values are overlaps (shorts)
+    """
+    layer_names = {number: name for name, number in plan.layer_table_rev.items()}
+    violations = []
+    for layer, shapes in sorted(_copper_shapes(plan).items()):
+        grid = _Grid(cell_size)
+        for index, (_, line, half_width) in enumerate(shapes):
+            grid.insert(index, _box(*line, half_width + clearance / 2))
+        checked = set()
+        for indices in grid.cells.values():
+            for i, first in enumerate(indices):
+                for second in indices[i + 1 :]:
+                    a, b = shapes[first], shapes[second]
+                    if a[0].net_code == b[0].net_code or (first, second) in checked:
+                        continue
+                    checked.add((first, second))
+                    gap = segment_distance(a[1], b[1]) - a[2] - b[2]
+                    if gap < clearance:
+                        violations.append(
+                            ClearanceViolation(layer_names[layer], a[0], b[0], gap)
+                        )
+    return violations
+
+
+def group_pads_by_net(pads):
+    """Group pads by short net name.
+
+    :param pads: pcbnew or kicad_pcb_parser pads
+    :return dict: net short name -> list of pads
+    """
+    nets = collections.defaultdict(list)
+    for pad in pads:
+        nets[pad.GetShortNetname()].append(pad)
+    return dict(nets)
+
+
+def _net_connectivity(plan, pads, tolerance, cell_size):
+    """Connect the pads, segments and vias of one net.
+
+    Segments only connect on their layer. Vias (through) and pads are treated as
+    present on all copper layers, so a pad connects to the tracks ending at it on
+    either side of the board. The size of the pads is unknown to the parser, so a
+    track has to end within the tolerance of the pad position.
+
+    :return tuple: (number of components, dangling segment ends as (layer, (x, y)))
+    """
+    net_code = pads[0].GetNetCode()
+    # nodes: segments, vias and pads as (layer or None for all layers, centre line,
+    # reach: half copper width plus tolerance)
+    nodes = [
+        (s.layer, (*s.start, *s.end), s.width / 2 + tolerance)
+        for s in plan.segments_on_net(net_code)
+    ]
+    nodes += [
+        (None, (*v.position, *v.position), v.width / 2 + tolerance)
+        for v in plan.vias_on_net(net_code)
+    ]
+    for pad in pads:
+        x, y = int(pad.GetPosition()[0]), int(pad.GetPosition()[1])
+        nodes.append((None, (x, y, x, y), tolerance))
+    grids = collections.defaultdict(lambda: _Grid(cell_size))
+    for index, (layer, line, reach) in enumerate(nodes):
+        grids[layer].insert(index, _box(*line, reach))
+
+    def touching(index, x, y, layer):
+        """Get the other nodes whose copper contains the point."""
+        found = set()
+        for grid_layer in list(grids) if layer is None else (layer, None):
+            for other in grids[grid_layer].query((x, y, x, y)):
+                if other == index or other in found:
+                    continue
+                _, line, reach = nodes[other]
+                if point_segment_distance(x, y, *line) <= reach:
+                    found.add(other)
+        return found
+
+    layer_names = {number: name for name, number in plan.layer_table_rev.items()}
+    union_find = _UnionFind(len(nodes))
+    dangling = []
+    for index, (layer, line, _) in enumerate(nodes):
+        ends = (line[:2], line[2:]) if layer is not None else (line[:2],)
+        for x, y in ends:
+            found = touching(index, x, y, layer)
+            for other in found:
+                union_find.union(index, other)
+            if layer is not None and not found:
+                dangling.append((layer_names[layer], (x, y)))
+    components = len({union_find.find(index) for index in range(len(nodes))})
+    return components, dangling
+
+
+def check_connectivity(plan, nets, tolerance=CONNECT_TOLERANCE, cell_size=CELL_SIZE):
+    """Find nets whose pads, tracks and vias are not one connected piece.
+
+    Like in pcbnew an object connects to another one if its anchor (track end, via or
+    pad position) lies on the copper of the other one, a track end missing a ring by
+    a few microns more than half the track width leaves the net open. Pads without
+    net (net code 0) are ignored.
+
+    :param routing_plan.RoutingPlan plan: generated tracks and vias
+    :param dict nets: net short name -> pads of the net (with the final placement)
+    :param int tolerance: distance (nm) an anchor may lie beside the copper
+    :param int cell_size: edge length of the grid cells (nm)
+    :return list of OpenNet: components is the number of isolated pieces, dangling the
+        track ends touching nothing as (layer name, (x, y))
+    """
+    open_nets = []
+    for name, pads in nets.items():
+        if not pads or pads[0].GetNetCode() == 0:
+            continue
+        components, dangling = _net_connectivity(plan, pads, tolerance, cell_size)
+        if components > 1:
+            open_nets.append(OpenNet(name, components, dangling))
+    return open_nets
+
+
+if __name__ == "__main__":
+    import make_StudioClock
+
+    board = make_StudioClock.load_board(
+        sys.argv[1] if len(sys.argv) > 1 else "StudioClock.kicad_pcb", "sexpr"
+    )
+    plan, _ = make_StudioClock.generate_board(board)
+    violations = check_clearance(plan)
+    for violation in violations:
+        print(
+            f"clearance {violation.gap / 1e6:.4f} mm on {violation.layer}: "
+            f"{violation.first} <-> {violation.second}"
+        )
+    print(f"{len(violations)} clearance violations")
+    open_nets = check_connectivity(plan, group_pads_by_net(plan.pads))
+    for open_net in open_nets:
+        print(
+            f"net {open_net.name} has {open_net.components} components, "
+            f"dangling ends: {open_net.dangling}"
+        )
+    print(f"{len(open_nets)} open nets")
+    sys.exit(1 if violations or open_nets else 0)
@@ -0,0 +1,247 @@
+"""Headless preview of a generated clock board as SVG or PNG.
+
+The tracks on F.Cu and B.Cu, the vias, the pads and the Edge.Cuts outline are drawn
+straight from the routing plan and the placed pads, without KiCad. The primitives are
+batched per layer and width: the SVG has one ``<path>`` per layer and width (vias and
+pads are round caps of zero length strokes) and the raster is drawn with numpy, one
+disk is stamped along all strokes of a width at once. The PNG files are written with
+zlib only, e.g. for the contact sheet of a sweep (``sweep_StudioClock.py
+--contact-sheet``).
+
+Example::
+
+    python board_preview.py StudioClock.kicad_pcb --svg preview.svg --png preview.png
+"""
+
+import argparse
+import io
+import math
+import struct
+import zlib
+
+import numpy as np
+
+from clock_geometry import IU_PER_MM
+from routing_plan import as_point
+
+#: what is drawn in drawing order (bottom first): layer names, "via" and "pad"
+DRAW_ORDER = ("B.Cu", "F.Cu", "pad", "via", "Edge.Cuts")
+#: RGB colors of DRAW_ORDER (as in pcbnew) and of the background
+COLORS = {
+    "B.Cu": (77, 127, 196),
+    "F.Cu": (200, 52, 52),
+    "pad": (194, 164, 35),
+    "via": (194, 194, 194),
+    "Edge.Cuts": (208, 210, 205),
+}
+BACKGROUND = (0, 16, 35)
+#: diameter of the pads (nm), the board parser does not read the pad shapes
+PAD_DIAMETER = 1500000
+#: space around the drawn board (nm)
+MARGIN = 2000000
+#: edge length of the PNG previews (pixels)
+DEFAULT_SIZE = 512
+
+
+def _strokes(plan, pads):
+    """Collect the strokes to draw, vias and pads are strokes of zero length.
+
+    :param routing_plan.RoutingPlan plan:
+    :param pads: placed pads (only their position is drawn)
+    :return list of tuple: (kind, width (nm), int64 array of x0, y0, x1, y1 rows) in
+        drawing order
+    """
+    kinds = np.full(max(plan.layer_table_rev.values(), default=0) + 1, -1, np.int64)
+    for i, kind in enumerate(DRAW_ORDER):
+        if kind in plan.layer_table_rev:
+            kinds[plan.layer(kind)] = i
+    segments, vias, drawings = plan.segments, plan.vias, plan.drawings
+    positions = np.array(
+        [as_point(pad.GetPosition()) for pad in pads], dtype=np.int64
+    ).reshape(-1, 2)
+    rows = np.concatenate(
+        [
+            np.column_stack((segments[:, 0:4], kinds[segments[:, 5]], segments[:, 6])),
+            np.column_stack(
+                (
+                    vias[:, [0, 1, 0, 1]],
+                    np.full(len(vias), DRAW_ORDER.index("via")),
+                    vias[:, 3],
+                )
+            ),
+            np.column_stack(
+                (
+                    positions[:, [0, 1, 0, 1]],
+                    np.full(len(positions), DRAW_ORDER.index("pad")),
+                    np.full(len(positions), PAD_DIAMETER),
+                )
+            ),
+            np.column_stack((drawings[:, 0:4], kinds[drawings[:, 4]], drawings[:, 5])),
+        ]
+    ).astype(np.int64)
+    rows = rows[rows[:, 4] >= 0]  # layers which are not drawn
+    return [
+        (
+            DRAW_ORDER[kind],
+            width,
+            rows[(rows[:, 4] == kind) & (rows[:, 5] == width), :4],
+        )
+        for kind, width in np.unique(rows[:, 4:6], axis=0).tolist()
+    ]
+
+
+def _bounds(strokes):
+    """Get the drawn area (nm) as x0, y0, x1, y1, the board outline if there is one."""
+    outline = [s for s in strokes if s[0] == "Edge.Cuts"] or strokes
+    if not outline:
+        return np.array([-MARGIN, -MARGIN, MARGIN, MARGIN])
+    points = np.concatenate([lines.reshape(-1, 2) for _, _, lines in outline])
+    margin = MARGIN + max(width for _, width, _ in outline) / 2
+    return np.concatenate([points.min(axis=0) - margin, points.max(axis=0) + margin])
+
+
+def render_svg(plan, pads):
+    """Draw the board as SVG (units mm), one path per layer and width.
+
+    :param routing_plan.RoutingPlan plan: generated tracks, vias and drawings
+    :param pads: placed pads (only their position is drawn)
+    :return str: SVG document
+    """
+    strokes = _strokes(plan, pads)
+    x0, y0, x1, y1 = (_bounds(strokes) / IU_PER_MM).tolist()
+    width, height = x1 - x0, y1 - y0
+    out = io.StringIO()
+    out.write(
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width:.3f}mm" '
+        f'height="{height:.3f}mm" viewBox="{x0:.3f} {y0:.3f} {width:.3f} '
+        f'{height:.3f}">\n<rect x="{x0:.3f}" y="{y0:.3f}" width="{width:.3f}" '
+        f'height="{height:.3f}" fill="rgb{BACKGROUND}"/>\n'
+    )
+    for kind, stroke_width, lines in strokes:
+        out.write(
+            f'<path class="{kind}" fill="none" stroke="rgb{COLORS[kind]}" '
+            f'stroke-width="{stroke_width / IU_PER_MM:g}" stroke-linecap="round" d="'
+        )
+        np.savetxt(out, lines / IU_PER_MM, fmt="M%.4f %.4fL%.4f %.4f", newline="")
+        out.write('"/>\n')
+    out.write("</svg>\n")
+    return out.getvalue()
+
+
+def _stamp(image, lines, radius, color):
+    """Draw strokes (pixels) with round caps by stamping a disk along all of them."""
+    start, end = lines[:, 0:2], lines[:, 2:4]
+    # samples not further apart than the radius, so the disks overlap
+    steps = np.ceil(np.hypot(*(end - start).T) / radius).astype(np.int64) + 1
+    index = np.repeat(np.arange(len(lines)), steps)
+    first = np.repeat(np.cumsum(steps) - steps, steps)
+    t = (np.arange(steps.sum()) - first) / np.repeat(np.maximum(steps - 1, 1), steps)
+    points = start[index] + (end - start)[index] * t[:, None]
+    centres = np.unique(np.rint(points).astype(np.int64), axis=0)
+    r = math.ceil(radius)
+    dy, dx = np.mgrid[-r : r + 1, -r : r + 1]
+    disk = dx**2 + dy**2 <= max(radius**2, 0.25)
+    offsets = np.column_stack((dx[disk], dy[disk]))
+    pixels = (centres[:, None, :] + offsets).reshape(-1, 2)
+    height, width = image.shape[:2]
+    inside = (
+        (pixels[:, 0] >= 0)
+        & (pixels[:, 0] < width)
+        & (pixels[:, 1] >= 0)
+        & (pixels[:, 1] < height)
+    )
+    image[pixels[inside, 1], pixels[inside, 0]] = color
+
+
+def render_raster(plan, pads, size=DEFAULT_SIZE):
+    """Draw the board into a square RGB raster, the board centred.
+
+    :param routing_plan.RoutingPlan plan: generated tracks, vias and drawings
+    :param pads: placed pads (only their position is drawn)
+    :param int size: edge length (pixels)
+    :return numpy.ndarray: uint8 array of shape (size, size, 3)
+    """
+    strokes = _strokes(plan, pads)
+    x0, y0, x1, y1 = _bounds(strokes)
+    scale = size / max(x1 - x0, y1 - y0)  # pixels per nm
+    origin = np.array([(x0 + x1) / 2, (y0 + y1) / 2]) - size / 2 / scale
+    image = np.empty((size, size, 3), dtype=np.uint8)
+    image[:] = BACKGROUND
+    for kind, width, lines in strokes:
+        pixels = (lines.reshape(-1, 2) - origin) * scale
+        _stamp(image, pixels.reshape(-1, 4), max(width * scale / 2, 0.5), COLORS[kind])
+    return image
+
+
+def contact_sheet(images, columns=None, gap=4):
+    """Tile rasters of the same shape into one raster, row by row.
+
+    :param list images: uint8 arrays as returned by render_raster()
+    :param int columns: images per row, default a square sheet
+    :param int gap: space between the images (pixels)
+    :return numpy.ndarray: uint8 array of shape (height, width, 3)
+    """
+    columns = columns or math.ceil(math.sqrt(len(images)))
+    rows = math.ceil(len(images) / columns)
+    height, width = images[0].shape[:2]
+    sheet = np.full(
+        (rows * (height + gap) + gap, columns * (width + gap) + gap, 3),
+        255,
+        dtype=np.uint8,
+    )
+    for i, image in enumerate(images):
+        row, column = divmod(i, columns)
+        y = gap + row * (height + gap)
+        x = gap + column * (width + gap)
+        sheet[y : y + height, x : x + width] = image
+    return sheet
+
+
+def write_png(image, path):
+    """Write an RGB raster as PNG (8 bit, without filters).
+
+    :param numpy.ndarray image: uint8 array of shape (height, width, 3)
+    :param str path: .png file
+    :return None:
+    """
+    height, width = image.shape[:2]
+    scanlines = np.zeros((height, width * 3 + 1), dtype=np.uint8)  # filter byte 0
+    scanlines[:, 1:] = image.reshape(height, -1)
+
+    def chunk(tag, data):
+        return (
+            struct.pack(">I", len(data))
+            + tag
+            + data
+            + struct.pack(">I", zlib.crc32(tag + data))
+        )
+
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+        f.write(chunk(b"IDAT", zlib.compress(scanlines.tobytes(), 6)))
+        f.write(chunk(b"IEND", b""))
+
+
+if __name__ == "__main__":
+    import make_StudioClock
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", nargs="?", default="StudioClock.kicad_pcb")
+    parser.add_argument(
+        "--params", help="TOML or JSON file of generate_board() parameters"
+    )
+    parser.add_argument("--svg", help="SVG file to write")
+    parser.add_argument("--png", help="PNG file to write")
+    parser.add_argument("--size", type=int, default=DEFAULT_SIZE)
+    args = parser.parse_args()
+
+    parameters = make_StudioClock.load_parameters(args.params) if args.params else {}
+    with make_StudioClock.load_board(args.input, "sexpr") as board:
+        plan, _ = make_StudioClock.generate_board(board, **parameters)
+        pads = plan.pads
+        if args.svg:
+            with open(args.svg, "w") as f:
+                f.write(render_svg(plan, pads))
+        if args.png:
+            write_png(render_raster(plan, pads, args.size), args.png)
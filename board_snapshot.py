@@ -0,0 +1,79 @@
+"""Snapshot of the placed pads for the routing.
+
+Every getter call on a pcbnew pad crosses the SWIG boundary and allocates a new wrapper
+(for the position, the parent module and the net). The routing asks the same pads for
+the same values many times, so the pads are read once after the placement into small
+``__slots__`` records. The records offer the getters the routing uses, so the routing
+code reads them like board pads.
+"""
+
+from routing_plan import as_point
+
+
+class ModuleRecord:
+    """Reference and position (nm) of a placed module."""
+
+    __slots__ = ("reference", "position")
+
+    def __init__(self, reference, position):
+        self.reference = reference
+        self.position = position
+
+    def GetReference(self):  # noqa
+        return self.reference
+
+    def GetPosition(self):  # noqa
+        return self.position
+
+
+class PadRecord:
+    """Name, net and position (nm) of a placed pad and its module."""
+
+    __slots__ = ("module", "name", "net_name", "net_code", "position")
+
+    def __init__(self, module, name, net_name, net_code, position):
+        self.module = module
+        self.name = name
+        self.net_name = net_name
+        self.net_code = net_code
+        self.position = position
+
+    def __repr__(self):
+        return f"PadRecord({self.module.reference}.{self.name}, {self.net_name})"
+
+    def GetParent(self):  # noqa
+        return self.module
+
+    def GetPadName(self):  # noqa
+        return self.name
+
+    def GetShortNetname(self):  # noqa
+        return self.net_name
+
+    def GetNetCode(self):  # noqa
+        return self.net_code
+
+    def GetPosition(self):  # noqa
+        return self.position
+
+
+def snapshot_pads(modules):
+    """Read the pads of placed modules (one read per value).
+
+    :param modules: pcbnew or kicad_pcb_parser modules
+    :return list of PadRecord: in the order of the modules and their pads
+    """
+    pads = []
+    for module in modules:
+        record = ModuleRecord(module.GetReference(), as_point(module.GetPosition()))
+        for pad in module.Pads():
+            pads.append(
+                PadRecord(
+                    record,
+                    pad.GetPadName(),
+                    pad.GetShortNetname(),
+                    pad.GetNetCode(),
+                    as_point(pad.GetPosition()),
+                )
+            )
+    return pads
@@ -0,0 +1,93 @@
+"""Vectorized geometry of the clock face.
+
+All functions work on whole arrays of clock positions (and radii) at once and return
+integer nanometre coordinates, the internal unit of pcbnew. The truncation towards zero
+matches ``pcbnew.wxPointMM``, so the results are identical to the per point calculation.
+
+The clock face has ``positions`` equally spaced positions (60 seconds by default, e.g.
+120 or 240 for finer LED rings), the rings are polygons with one vertex per position.
+"""
+
+import functools
+
+import numpy as np
+
+IU_PER_MM = 1000000
+CLOCK_POSITIONS = 60
+
+
+def mm_to_nm(values):
+    """Convert millimetres to integer nanometres like ``pcbnew.FromMM`` (truncating).
+
+    :param array_like values: values in mm
+    :return numpy.ndarray: int64 values in nm
+    """
+    return np.trunc(np.asarray(values, dtype=float) * IU_PER_MM).astype(np.int64)
+
+
+def clock_angles_rad(clock_positions, positions=CLOCK_POSITIONS):
+    """Calculate the rotation angles (rad) of an array of clock positions.
+
+    :param array_like clock_positions:
+    :param int positions: number of positions of the clock face
+    :return numpy.ndarray:
+    """
+    clock_positions = np.asarray(clock_positions, dtype=float)
+    return -np.pi * 2 / positions * (clock_positions % positions) - np.pi
+
+
+def clock_locations_nm(radius, clock_positions, positions=CLOCK_POSITIONS):
+    """Calculate the xy locations (nm) of clock positions on one or several radii.
+
+    The radii are broadcast against the positions, so a batch of k radii and n positions
+    results in an array of shape (k, n, 2).
+
+    :param array_like radius: radius or radii in mm
+    :param array_like clock_positions: clock positions [0, ..., positions]
+    :param int positions: number of positions of the clock face
+    :return numpy.ndarray: int64 array with x and y in the last axis
+    """
+    angles = clock_angles_rad(clock_positions, positions)
+    radius = np.asarray(radius, dtype=float)
+    if radius.ndim:
+        radius = radius[..., np.newaxis]
+    return mm_to_nm(np.stack((np.sin(angles) * radius, np.cos(angles) * radius), -1))
+
+
+@functools.lru_cache(maxsize=None)
+def _unit_ring(positions):
+    angles = clock_angles_rad(np.arange(positions), positions)
+    return np.stack((np.sin(angles), np.cos(angles)), -1)
+
+
+def ring_vertices_nm(radius, positions=CLOCK_POSITIONS):
+    """Get the vertices (clock position 0 to positions - 1) of the polygon ring.
+
+    The unit ring is calculated once per number of positions, so a ring (or a batch of
+    rings) only costs one multiplication per vertex.
+
+    :param array_like radius: nominal radius or radii of the ring in mm
+    :param int positions: number of positions of the clock face
+    :return numpy.ndarray: int64 array of shape (positions, 2) or (k, positions, 2)
+    """
+    radius = np.asarray(radius, dtype=float)[..., np.newaxis, np.newaxis]
+    return mm_to_nm(_unit_ring(positions) * radius)
+
+
+def arc_vertices_nm(
+    radius, start_clock_position, stop_clock_position, step=1, positions=CLOCK_POSITIONS
+):
+    """Get the polygon vertices from start to stop clock position (both included).
+
+    Clock positions beyond ``positions`` wrap around the ring, a negative step walks
+    counterclockwise.
+
+    :param float radius: nominal radius of the ring in mm
+    :param int start_clock_position:
+    :param int stop_clock_position:
+    :param int step: 1 or -1
+    :param int positions: number of positions of the clock face
+    :return numpy.ndarray: int64 array of shape (n, 2)
+    """
+    clock_positions = np.arange(start_clock_position, stop_clock_position + step, step)
+    return ring_vertices_nm(radius, positions)[clock_positions.astype(int) % positions]
@@ -0,0 +1,137 @@
+"""Reader of KiCad netlists (``.net``, Eeschema 5 and later) and component grouping.
+
+The netlist is streamed line by line, only the ``(comp ...)`` and ``(net ...)`` blocks
+are read. The references are split into prefix and index once, the clock generator
+groups its modules with these tables instead of hard-coded reference ranges.
+"""
+
+import collections
+import re
+
+Component = collections.namedtuple(
+    "Component", ("ref", "prefix", "index", "value", "footprint")
+)
+Netlist = collections.namedtuple("Netlist", ("components", "nets"))
+
+_RE_COMP = re.compile(r'^\s*\(comp \(ref "?([^")\s]+)"?\)')
+_RE_VALUE = re.compile(r'^\s*\(value ("(?:[^"\\]|\\.)*"|[^)]*)\)')
+_RE_FOOTPRINT = re.compile(r'^\s*\(footprint ("(?:[^"\\]|\\.)*"|[^)]*)\)')
+_RE_NET = re.compile(r'^\s*\(net \(code "?(\d+)"?\) \(name ("(?:[^"\\]|\\.)*"|[^)]*)\)')
+_RE_NODE = re.compile(r'\(node \(ref "?([^")\s]+)"?\) \(pin "?([^")\s]+)"?\)')
+_RE_REFERENCE = re.compile(r"([^\d]*)(\d*)")
+
+
+def _unquote(value):
+    return value[1:-1] if value.startswith('"') else value
+
+
+def split_reference(reference):
+    """Split a reference into prefix and index, e.g. "D12" -> ("D", 12).
+
+    :param str reference:
+    :return tuple: (str, int), the index is 0 without number
+    """
+    prefix, index = _RE_REFERENCE.match(reference).groups()
+    return prefix, int(index or 0)
+
+
+def read_netlist(path):
+    """Read the components and nets of a netlist.
+
+    :param str path: .net file
+    :return Netlist: components as reference -> Component (in file order) and nets as
+        short net name -> list of (reference, pin)
+    """
+    components = {}
+    nets = {}
+    component = None
+    nodes = None
+    with open(path) as f:
+        for line in f:
+            match = _RE_COMP.match(line)
+            if match:
+                component = dict(ref=match.group(1), value="", footprint="")
+                components[component["ref"]] = component
+                nodes = None
+                continue
+            match = _RE_NET.match(line)
+            if match:
+                nodes = nets[_unquote(match.group(2)).rsplit("/", 1)[-1]] = []
+                component = None
+            if nodes is not None:
+                nodes.extend(_RE_NODE.findall(line))
+            elif component is not None:
+                for key, regex in (("value", _RE_VALUE), ("footprint", _RE_FOOTPRINT)):
+                    match = regex.match(line)
+                    if match:
+                        component[key] = _unquote(match.group(1))
+    return Netlist(
+        {
+            ref: Component(
+                ref, *split_reference(ref), component["value"], component["footprint"]
+            )
+            for ref, component in components.items()
+        },
+        nets,
+    )
+
+
+def components_from_references(references):
+    """Create components without value and footprint (e.g. from board modules).
+
+    :param references: e.g. ["D1", "U1"]
+    :return dict: reference -> Component
+    """
+    return {ref: Component(ref, *split_reference(ref), "", "") for ref in references}
+
+
+def component_kind(component):
+    """Classify a component of the clock by footprint, value or reference prefix.
+
+    :param Component component:
+    :return str: "led", "digit", "connector" or "other"
+    """
+    footprint = component.footprint.split(":")[-1].upper()
+    value = component.value.upper()
+    if footprint.startswith("LED") or value == "LED":
+        return "led"
+    if "7SEG" in footprint or "7SEG" in value:
+        return "digit"
+    if footprint.startswith(("PINHEADER", "CONN")) or value.startswith("CONN"):
+        return "connector"
+    return {"D": "led", "U": "digit", "J": "connector"}.get(component.prefix, "other")
+
+
+def group_components(components, positions, hour_markers):
+    """Group the components of the clock, each group ordered by reference index.
+
+    The LEDs are the ``positions`` second LEDs, followed by the hour markers and the
+    two separation LEDs of the digits.
+
+    :param dict components: reference -> Component
+    :param int positions: number of second LEDs (clock positions)
+    :param int hour_markers: number of hour marker LEDs
+    :return dict: group ("seconds", "hours", "separation", "digits", "connectors") ->
+        list of Component
+    :raises ValueError: if the number of LEDs does not match
+    """
+    kinds = collections.defaultdict(list)
+    for component in components.values():
+        kinds[component_kind(component)].append(component)
+    for group in kinds.values():
+        group.sort(key=lambda c: (c.prefix, c.index))
+    leds = kinds["led"]
+    if len(leds) != positions + hour_markers + 2:
+        raise ValueError(
+            f"{len(leds)} LEDs do not fit {positions} positions, {hour_markers} hour "
+            f"markers and 2 separation LEDs"
+        )
+    first_hour = positions
+    first_separation = first_hour + hour_markers
+    return {
+        "seconds": leds[:first_hour],
+        "hours": leds[first_hour:first_separation],
+        "separation": leds[first_separation:],
+        "digits": kinds["digit"],
+        "connectors": kinds["connector"],
+    }
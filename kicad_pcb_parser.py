@@ -0,0 +1,308 @@
+"""Fast, pcbnew independent reader for ``.kicad_pcb`` files (KiCad 5, version 20171130).
+
+The file is mapped into memory and only the top level items are located with one
+regular expression scan. The layer table and the nets are decoded right away, the
+module blocks only on first access, everything else (e.g. the old segments and vias)
+is never decoded.
+
+:class:`KicadPcb` offers the small subset of the ``pcbnew.BOARD`` API the clock
+generator uses, so the routing code runs unchanged on it.
+"""
+
+import hashlib
+import math
+import mmap
+import re
+
+from clock_geometry import IU_PER_MM
+from routing_plan import Point
+
+#: default layer names of KiCad 5, the (layers ...) table of the file overrides them
+DEFAULT_LAYER_NAMES = {
+    0: "F.Cu",
+    **{num: f"In{num}.Cu" for num in range(1, 31)},
+    31: "B.Cu",
+    32: "B.Adhes",
+    33: "F.Adhes",
+    34: "B.Paste",
+    35: "F.Paste",
+    36: "B.SilkS",
+    37: "F.SilkS",
+    38: "B.Mask",
+    39: "F.Mask",
+    40: "Dwgs.User",
+    41: "Cmts.User",
+    42: "Eco1.User",
+    43: "Eco2.User",
+    44: "Edge.Cuts",
+    45: "Margin",
+    46: "B.CrtYd",
+    47: "F.CrtYd",
+    48: "B.Fab",
+    49: "F.Fab",
+}
+
+_RE_TOP_LEVEL_ITEM = re.compile(rb"^  \((\w+)", re.M)
+_RE_LAYER = re.compile(rb"^    \((\d+) (\"[^\"]*\"|\S+) \w+", re.M)
+_RE_NET = re.compile(rb"\(net (\d+) (\"(?:[^\"\\]|\\.)*\"|[^\s)]+)?\)")
+_RE_AT = re.compile(rb"\(at (-?[\d.]+) (-?[\d.]+)(?: (-?[\d.]+))?\)")
+_RE_REFERENCE = re.compile(rb"\(fp_text reference (\"[^\"]*\"|\S+)")
+_RE_PAD = re.compile(rb"\(pad (\"[^\"]*\"|\S+) ")
+_RE_PAD_NET = re.compile(rb"\(net (\d+) ")
+
+
+def _to_nm(value):
+    return round(float(value) * IU_PER_MM)
+
+
+def _unquote(value):
+    value = value.decode()
+    return value[1:-1] if value.startswith('"') else value
+
+
+def rotate_point(x, y, angle):
+    """Rotate a point like KiCad's RotatePoint (angle in 0.1 deg).
+
+    :param int x:
+    :param int y:
+    :param float angle:
+    :return tuple of int:
+    """
+    angle = angle % 3600
+    if angle == 0:
+        return x, y
+    if angle == 900:
+        return y, -x
+    if angle == 1800:
+        return -x, -y
+    if angle == 2700:
+        return -y, x
+    sinus = math.sin(math.radians(angle / 10))
+    cosinus = math.cos(math.radians(angle / 10))
+    rotated_x = y * sinus + x * cosinus
+    rotated_y = y * cosinus - x * sinus
+    # KiROUND rounds half away from zero
+    return (
+        int(math.copysign(math.floor(abs(rotated_x) + 0.5), rotated_x)),
+        int(math.copysign(math.floor(abs(rotated_y) + 0.5), rotated_y)),
+    )
+
+
+class Net:
+    """A net of the board (code and full name)."""
+
+    __slots__ = ("code", "name")
+
+    def __init__(self, code, name):
+        self.code = code
+        self.name = name
+
+    def GetNetCode(self):  # noqa
+        return self.code
+
+    def GetNetname(self):  # noqa
+        return self.name
+
+    def GetShortNetname(self):  # noqa
+        return self.name.rsplit("/", 1)[-1]
+
+
+class Pad:
+    """A pad of a module, its position follows the position of the module."""
+
+    __slots__ = ("module", "name", "local_position", "net")
+
+    def __init__(self, module, name, local_position, net):
+        self.module = module
+        self.name = name
+        self.local_position = local_position
+        self.net = net
+
+    def GetParent(self):  # noqa
+        return self.module
+
+    def GetPadName(self):  # noqa
+        return self.name
+
+    def GetNet(self):  # noqa
+        return self.net
+
+    def GetNetCode(self):  # noqa
+        return self.net.code
+
+    def GetShortNetname(self):  # noqa
+        return self.net.GetShortNetname()
+
+    def GetPosition(self):  # noqa
+        x, y = rotate_point(*self.local_position, self.module.orientation)
+        return Point(x + self.module.position.x, y + self.module.position.y)
+
+
+class Module:
+    """A module (footprint) with reference, placement and pads."""
+
+    __slots__ = ("index", "reference", "position", "orientation", "pads")
+
+    def __init__(self, index, reference, position, orientation):
+        self.index = index  # position in file, used for sorting
+        self.reference = reference
+        self.position = position
+        self.orientation = orientation
+        self.pads = []
+
+    def __lt__(self, other):
+        return self.index < other.index
+
+    def GetReference(self):  # noqa
+        return self.reference
+
+    def GetPosition(self):  # noqa
+        return self.position
+
+    def SetPosition(self, position):  # noqa
+        self.position = Point(int(position[0]), int(position[1]))
+
+    def GetOrientation(self):  # noqa
+        return self.orientation
+
+    def SetOrientation(self, orientation):  # noqa
+        self.orientation = orientation
+
+    def Pads(self):  # noqa
+        return list(self.pads)
+
+
+class KicadPcb:
+    """Lazy index of a ``.kicad_pcb`` file.
+
+    The file mapping is released as soon as the modules are decoded, use it as context
+    manager or call :meth:`close` to release it earlier.
+
+    :param str path: board file
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.layer_table = dict(DEFAULT_LAYER_NAMES)
+        self.nets = {}
+        self._item_spans = []  # (kind, start, end) of all top level items
+        self._module_spans = []
+        self._modules = None
+        self._index()
+
+    def _index(self):
+        """Locate all top level items, decode the layer table and the nets."""
+        starts = [
+            (match.start(), match.group(1))
+            for match in _RE_TOP_LEVEL_ITEM.finditer(self._map)
+        ]
+        ends = [start for start, _ in starts[1:]] + [len(self._map)]
+        for (start, kind), end in zip(starts, ends):
+            self._item_spans.append((kind.decode(), start, end))
+            if kind == b"module":
+                self._module_spans.append((start, end))
+            elif kind == b"net":
+                match = _RE_NET.match(self._map, start + 2, end)
+                name = _unquote(match.group(2)) if match.group(2) else ""
+                self.nets[int(match.group(1))] = Net(int(match.group(1)), name)
+            elif kind == b"layers":
+                for match in _RE_LAYER.finditer(self._map, start, end):
+                    self.layer_table[int(match.group(1))] = _unquote(match.group(2))
+        self.layer_table_rev = {name: num for num, name in self.layer_table.items()}
+
+    def _decode_module(self, index, start, end):
+        block = self._map[start:end]
+        at = _RE_AT.search(block)
+        module = Module(
+            index,
+            _unquote(_RE_REFERENCE.search(block).group(1)),
+            Point(_to_nm(at.group(1)), _to_nm(at.group(2))),
+            float(at.group(3) or 0) * 10,
+        )
+        pad_matches = list(_RE_PAD.finditer(block))
+        pad_ends = [match.start() for match in pad_matches[1:]] + [len(block)]
+        for match, pad_end in zip(pad_matches, pad_ends):
+            pad_at = _RE_AT.search(block, match.end(), pad_end)
+            net = _RE_PAD_NET.search(block, match.end(), pad_end)
+            module.pads.append(
+                Pad(
+                    module,
+                    _unquote(match.group(1)),
+                    (_to_nm(pad_at.group(1)), _to_nm(pad_at.group(2))),
+                    self.nets[int(net.group(1)) if net else 0],
+                )
+            )
+        return module
+
+    @property
+    def modules(self):
+        """Modules by reference in file order, decoded on first access."""
+        if self._modules is None:
+            self._modules = {}
+            for index, (start, end) in enumerate(self._module_spans):
+                module = self._decode_module(index, start, end)
+                self._modules[module.reference] = module
+            self.close()  # everything needed is decoded
+        return self._modules
+
+    def content_digest(self, exclude=()):
+        """Hash the top level items of the file, except some kinds of items.
+
+        :param exclude: kinds of items to skip, e.g. ("segment", "via")
+        :return str: sha256 hex digest
+        """
+        digest = hashlib.sha256()
+        with open(self.path, "rb") as f, mmap.mmap(
+            f.fileno(), 0, access=mmap.ACCESS_READ
+        ) as data:
+            for kind, start, end in self._item_spans:
+                if kind not in exclude:
+                    digest.update(data[start:end])
+        return digest.hexdigest()
+
+    def close(self):
+        """Release the file mapping."""
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # subset of the pcbnew.BOARD API used by the generator
+
+    def BuildListOfNets(self):  # noqa
+        pass
+
+    def GetFileName(self):  # noqa
+        return self.path
+
+    def GetLayerName(self, num):  # noqa
+        return self.layer_table.get(num, "")
+
+    def GetModules(self):  # noqa
+        return list(self.modules.values())
+
+    def GetPads(self):  # noqa
+        return [pad for module in self.modules.values() for pad in module.pads]
+
+    def GetTracks(self):  # noqa
+        """Old tracks are never decoded, the board writer drops them."""
+        return []
+
+    def GetDrawings(self):  # noqa
+        """Old drawings are never decoded, the board writer drops them."""
+        return []
+
+
+def load_board(path):
+    """Load a board file without pcbnew.
+
+    :param str path:
+    :return KicadPcb:
+    """
+    return KicadPcb(path)
@@ -0,0 +1,217 @@
+"""Headless writer for ``.kicad_pcb`` files (KiCad 5, version 20171130).
+
+The template board is streamed item by item into the output file. Modules get their
+new placement, the old tracks, vias and board drawings are dropped and the objects of a
+:class:`routing_plan.RoutingPlan` are appended. Neither pcbnew nor an object graph of
+the board is needed, only one module block is held in memory at a time.
+"""
+
+import os
+import re
+
+from clock_geometry import IU_PER_MM
+
+#: top level items replaced by the routing plan (pcbnew deletes them before routing)
+REPLACED_ITEMS = (
+    "segment",
+    "via",
+    "gr_line",
+    "gr_arc",
+    "gr_circle",
+    "gr_poly",
+    "gr_curve",
+    "gr_text",
+    "dimension",
+)
+
+_RE_TOP_LEVEL_ITEM = re.compile(r"^  \((\w+)")
+_RE_AT = re.compile(r"\(at (-?[\d.]+) (-?[\d.]+)(?: (-?[\d.]+))?\)")
+_RE_REFERENCE = re.compile(r"\(fp_text reference (\S+)")
+_RE_GENERAL_COUNT = re.compile(r"^(    \((tracks|drawings) )\d+\)$")
+_RE_ITEM_NET = re.compile(r"\(net (\d+)\)")
+_RE_QUOTED = re.compile(r'"(?:[^"\\]|\\.)*"')
+
+
+def format_nm(value):
+    """Format an integer nm value as mm the way pcbnew does (no trailing zeros).
+
+    :param int value:
+    :return str:
+    """
+    sign = "-" if value < 0 else ""
+    integer, fraction = divmod(abs(int(value)), IU_PER_MM)
+    if not fraction:
+        return f"{sign}{integer}"
+    return f"{sign}{integer}.{fraction:06d}".rstrip("0")
+
+
+def format_angle(decidegrees):
+    """Format an angle in 0.1 deg as degrees in [0, 360) (no trailing zeros).
+
+    :param float decidegrees:
+    :return str:
+    """
+    degrees = round(decidegrees / 10.0 % 360, 6) % 360
+    return f"{degrees:.6f}".rstrip("0").rstrip(".")
+
+
+def _paren_depth(line):
+    line = _RE_QUOTED.sub("", line)
+    return line.count("(") - line.count(")")
+
+
+def _place_module_block(lines, placements):
+    """Rewrite the position and the absolute angles of one module block.
+
+    :param list lines: lines of the module block
+    :param dict placements: reference -> (position, orientation)
+    :return list: rewritten lines
+    """
+    reference = next((m.group(1) for m in map(_RE_REFERENCE.search, lines) if m), None)
+    if reference not in placements:
+        return lines
+    (x, y), orientation = placements[reference]
+    at = _RE_AT.search(lines[1])
+    old_orientation = float(at.group(3) or 0) * 10
+    if orientation is None:
+        orientation = old_orientation
+    rotation = orientation - old_orientation
+
+    placed = [lines[0]]
+    at_module = f"(at {format_nm(x)} {format_nm(y)}"
+    if format_angle(orientation) != "0":
+        at_module += f" {format_angle(orientation)}"
+    placed.append(_RE_AT.sub(at_module + ")", lines[1], count=1))
+    for line in lines[2:]:
+        stripped = line.lstrip()
+        if rotation and stripped.startswith(("(pad ", "(fp_text ")):
+
+            def rotate(match):
+                angle = float(match.group(3) or 0) * 10 + rotation
+                at_item = f"(at {match.group(1)} {match.group(2)}"
+                if format_angle(angle) != "0":
+                    at_item += f" {format_angle(angle)}"
+                return at_item + ")"
+
+            line = _RE_AT.sub(rotate, line, count=1)
+        placed.append(line)
+    return placed
+
+
+def format_plan(plan):
+    """Format all objects of a routing plan as top level board items.
+
+    :param routing_plan.RoutingPlan plan:
+    :return iterator of str: one line per object
+    """
+    layer_names = {number: name for name, number in plan.layer_table_rev.items()}
+    via_layers = f"{layer_names[plan.layer('F.Cu')]} {layer_names[plan.layer('B.Cu')]}"
+    for x0, y0, x1, y1, net_code, layer, width in plan.segments.tolist():
+        yield (
+            f"  (segment (start {format_nm(x0)} {format_nm(y0)}) "
+            f"(end {format_nm(x1)} {format_nm(y1)}) (width {format_nm(width)}) "
+            f"(layer {layer_names[layer]}) (net {net_code}))\n"
+        )
+    for x, y, net_code, width, drill in plan.vias.tolist():
+        yield (
+            f"  (via (at {format_nm(x)} {format_nm(y)}) (size {format_nm(width)}) "
+            f"(drill {format_nm(drill)}) (layers {via_layers}) (net {net_code}))\n"
+        )
+    for x0, y0, x1, y1, layer, width in plan.drawings.tolist():
+        yield (
+            f"  (gr_line (start {format_nm(x0)} {format_nm(y0)}) "
+            f"(end {format_nm(x1)} {format_nm(y1)}) (layer {layer_names[layer]}) "
+            f"(width {format_nm(width)}))\n"
+        )
+
+
+def _count_kept_items(template_path, keep_net_codes, keep_drawings):
+    counts = {"tracks": 0, "drawings": 0}
+    with open(template_path) as template:
+        for line in template:
+            match = _RE_TOP_LEVEL_ITEM.match(line)
+            if not match or match.group(1) not in REPLACED_ITEMS:
+                continue
+            if match.group(1) in ("segment", "via"):
+                net = _RE_ITEM_NET.search(line)
+                counts["tracks"] += bool(net and int(net.group(1)) in keep_net_codes)
+            else:
+                counts["drawings"] += keep_drawings
+    return counts
+
+
+def write_board(
+    template_path,
+    output_path,
+    plan,
+    placements,
+    keep_net_codes=frozenset(),
+    keep_drawings=False,
+):
+    """Write a board file from a template, new module placements and a routing plan.
+
+    The output is written to a temporary file first and then atomically moved to
+    ``output_path``, so the template may be the output file itself. For incremental
+    updates the tracks and vias of some nets and the drawings of the template can be
+    kept, the plan then only holds the regenerated objects.
+
+    :param str template_path: existing .kicad_pcb file
+    :param str output_path: file to write
+    :param routing_plan.RoutingPlan plan: tracks, vias and drawings to add
+    :param dict placements: reference -> (position (nm), orientation (0.1 deg) or None)
+    :param keep_net_codes: nets whose tracks and vias are copied from the template
+    :param bool keep_drawings: copy the drawings of the template
+    :return None:
+    """
+    counts = {"tracks": 0, "drawings": 0}
+    if keep_net_codes or keep_drawings:
+        counts = _count_kept_items(template_path, keep_net_codes, keep_drawings)
+    counts["tracks"] += len(plan.segments) + len(plan.vias)
+    counts["drawings"] += len(plan.drawings)
+    tmp_path = f"{output_path}.tmp"
+    with open(template_path) as template, open(tmp_path, "w") as out:
+        in_general = False
+        block = []  # lines of the current multiline module
+        block_mode = None  # "module", "skip" or "copy" until the item is closed
+        depth = 0
+        for line in template:
+            if block_mode:
+                depth += _paren_depth(line)
+                if block_mode == "module":
+                    block.append(line)
+                elif block_mode == "copy":
+                    out.write(line)
+                if depth <= 0:
+                    if block_mode == "module":
+                        out.writelines(_place_module_block(block, placements))
+                    block = []
+                    block_mode = None
+                continue
+            match = _RE_TOP_LEVEL_ITEM.match(line)
+            if match:
+                kind = match.group(1)
+                in_general = kind == "general"
+                depth = _paren_depth(line)
+                if kind in REPLACED_ITEMS:
+                    if kind in ("segment", "via"):
+                        net = _RE_ITEM_NET.search(line)
+                        keep = bool(net) and int(net.group(1)) in keep_net_codes
+                    else:
+                        keep = keep_drawings
+                    if keep:
+                        out.write(line)
+                    if depth > 0:
+                        block_mode = "copy" if keep else "skip"
+                    continue
+                if kind == "module" and depth > 0:
+                    block = [line]
+                    block_mode = "module"
+                    continue
+            elif in_general:
+                general = _RE_GENERAL_COUNT.match(line.rstrip("\n"))
+                if general:
+                    line = f"{general.group(1)}{counts[general.group(2)]})\n"
+            if line.rstrip() == ")":
+                out.writelines(format_plan(plan))
+            out.write(line)
+    os.replace(tmp_path, output_path)
@@ -1,225 +1,300 @@
 import collections
+import contextlib
+import functools
+import inspect
+import json
+import logging
 import math
+import os
 import re
-
-import numpy as np
-import pcbnew
-
-
-def calc_rad_angle_from_clock_position(clock_position):
+import sys
+import time
+
+import board_checks
+import board_snapshot
+import clock_geometry
+import kicad_netlist
+import kicad_pcb_parser
+import kicad_pcb_writer
+import net_fingerprints
+import profiling
+from routing_plan import (
+    TRACK_WIDTH,
+    Point,
+    RoutingPlan,
+    as_point,
+    commit_plan,
+    distance_mm,
+    offset_mm,
+    point_mm,
+)
+
+#: logger of the generator, the per module and per net messages are on level DEBUG
+log = logging.getLogger("make_StudioClock")
+
+#: number of ring intersections kept by the memoized geometry helpers
+GEOMETRY_CACHE_SIZE = 4096
+#: default distance (mm / 1.4) of the U connection of every digit net to the pads
+NET_NORM_DISTANCES = dict(
+    k0=-3,
+    k1=3,
+    k2=-4,
+    k3=4,
+    k4=-5,
+    k5=5,
+    k6=-6,
+    k7=6,
+    k8=-3,
+    k9=-4,
+    k10=4,
+    k11=-5,
+    k12=5,
+    k13=-6,
+    k14=6,
+    k15=3,
+)
+
+
+def calc_rad_angle_from_clock_position(
+    clock_position, positions=clock_geometry.CLOCK_POSITIONS
+):
     """Calculate the rotation angle (rad) of a module at clock Position.
 
     :param int clock_position:
+    :param int positions: number of positions of the clock face
     :return float:
     """
-    return -math.pi / 30 * (clock_position % 60) - math.pi
+    return -math.pi * 2 / positions * (clock_position % positions) - math.pi
 
 
-def calc_deg_angle_from_clock_position(clock_position):
+def calc_deg_angle_from_clock_position(
+    clock_position, positions=clock_geometry.CLOCK_POSITIONS
+):
     """Calculate the rotation angle (deg) of a module at clock Position.
 
     :param int clock_position:
+    :param int positions: number of positions of the clock face
     :return float:
     """
-    return math.degrees(calc_rad_angle_from_clock_position(clock_position))
+    return math.degrees(calc_rad_angle_from_clock_position(clock_position, positions))
 
 
-def calc_xy_location_from_clock_position_WxPoint(radius, clock_position):  # noqa
-    """
+def calc_xy_location_from_clock_position_WxPoint(  # noqa
+    radius, clock_position, positions=clock_geometry.CLOCK_POSITIONS
+):
+    """Calculate the location of a single clock position on a circle.
 
-    :param radius:
-    :param clock_position:
-    :return:
+    :param float radius: radius of the circle in mm
+    :param float clock_position:
+    :param int positions: number of positions of the clock face
+    :return Point:
     """
-    return pcbnew.wxPointMM(
-        math.sin(calc_rad_angle_from_clock_position(clock_position)) * radius,
-        math.cos(calc_rad_angle_from_clock_position(clock_position)) * radius,
+    return Point(
+        *clock_geometry.clock_locations_nm(radius, clock_position, positions).tolist()
     )
 
 
-def radius_from_net_number(number):
+def radius_from_net_number(number, radius, rings=16):
     """Calculates a radius from a number with a hardcoded formular.
 
     :param int number:
+    :param float radius: radius of the second LEDs
+    :param int rings: number of cathode rings (cathode nets)
     :return float:
     """
-    return Radius - 1.2 - (16 - number) * 0.75
+    return radius - 1.2 - (rings - number) * 0.75
 
 
-def add_track(start_location, stop_location, net_code, layer):
+def add_track(plan, start_location, stop_location, net_code, layer):
     """Add a track with given parameters.
 
-    :param pcbnew.wxPoint start_location: start position of track
-    :param pcbnew.wxPoint stop_location: stop position of track
+    :param RoutingPlan plan: plan the track is added to
+    :param Point start_location: start position of track
+    :param Point stop_location: stop position of track
     :param int net_code: id of net as returned by GetNetCode()
     :param int layer: integer code of layer on pcb
-    :return pcbnew.Track: added track
+    :return Segment: added track
     """
-    track = pcbnew.TRACK(pcb)
-    pcb.Add(track)
-    track.SetStart(start_location)
-    track.SetEnd(stop_location)
-    track.SetNetCode(net_code)
-    track.SetLayer(layer)
-    track.SetWidth(300000)
-    return track
+    profiling.count("add_track")
+    return plan.add_segment(start_location, stop_location, net_code, layer)
 
 
 def add_track_arc(
-    radius_polygon, start_clock_position, stop_clock_position, net_code, layer
+    plan,
+    radius_polygon,
+    start_clock_position,
+    stop_clock_position,
+    net_code,
+    layer,
+    positions=clock_geometry.CLOCK_POSITIONS,
 ):
-    """Add a polygon arc (based on a 60 segment polygon) tracks with given parameters.
+    """Add the tracks of a polygon arc (of a ``positions`` segment polygon).
 
+    :param RoutingPlan plan: plan the tracks are added to
     :param float radius_polygon: nominal radius of the ring
-    :param float start_clock_position: start clock position [0, ..., 60]
-    :param float stop_clock_position: stop clock position [0, ..., 60]
+    :param float start_clock_position: start clock position [0, ..., positions]
+    :param float stop_clock_position: stop clock position [0, ..., positions]
     :param int net_code: id of net as returned by GetNetCode()
     :param int layer: integer code of layer on pcb
-    :return tuple of pcbnew.Track: first and last added track
+    :param int positions: number of positions (polygon segments) of the clock face
+    :return tuple of Segment: first and last added track
     """
-    track_start = None
-    track_stop = None
-
-    start_frac, _start_int = np.modf(start_clock_position)
-    stop_frac, _stop_int = np.modf(stop_clock_position)
+    profiling.count("add_track_arc")
+    start_frac, _start_int = math.modf(start_clock_position)
+    stop_frac, _stop_int = math.modf(stop_clock_position)
     if stop_clock_position > start_clock_position:
         if start_frac:
             _start_int += 1
-        for clock_pos in np.arange(_start_int, _stop_int):
-            track_stop = add_track(
-                calc_xy_location_from_clock_position_WxPoint(radius_polygon, clock_pos),
-                calc_xy_location_from_clock_position_WxPoint(
-                    radius_polygon, clock_pos + 1
-                ),
-                net_code,
-                layer,
-            )
-            if track_start is None:
-                track_start = track_stop
+        vertices = clock_geometry.arc_vertices_nm(
+            radius_polygon, _start_int, _stop_int, 1, positions
+        )
     else:
         if stop_frac:
             _stop_int -= 1
-        for clock_pos in np.arange(_start_int, _stop_int, -1):
-            track_stop = add_track(
-                calc_xy_location_from_clock_position_WxPoint(radius_polygon, clock_pos),
-                calc_xy_location_from_clock_position_WxPoint(
-                    radius_polygon, clock_pos - 1
-                ),
-                net_code,
-                layer,
-            )
-            if track_start is None:
-                track_start = track_stop
+        vertices = clock_geometry.arc_vertices_nm(
+            radius_polygon, _start_int, _stop_int, -1, positions
+        )
+    # the polygon is appended in one step, KiCad 5 boards have no arc tracks
+    profiling.count("add_track", max(len(vertices) - 1, 0))
+    track_start, track_stop = plan.add_polyline(vertices, net_code, layer)
     if start_frac:
         track_start = add_track(
-            get_ring_intersection_by_position(radius_polygon, start_clock_position),
-            track_start.GetStart(),
+            plan,
+            get_ring_intersection_by_position(
+                radius_polygon, start_clock_position, positions
+            ),
+            track_start.start,
             net_code,
             layer,
         )
     if stop_frac:
         track_stop = add_track(
-            track_stop.GetEnd(),
-            get_ring_intersection_by_position(radius_polygon, stop_clock_position),
+            plan,
+            track_stop.end,
+            get_ring_intersection_by_position(
+                radius_polygon, stop_clock_position, positions
+            ),
             net_code,
             layer,
         )
     return track_start, track_stop
 
 
-def add_track_ring(radius_polygon, net_code, layer):
-    """Add a polygon ring of 60 tracks with given parameters.
+def add_track_ring(
+    plan, radius_polygon, net_code, layer, positions=clock_geometry.CLOCK_POSITIONS
+):
+    """Add a polygon ring of one track per clock position with given parameters.
 
+    :param RoutingPlan plan: plan the tracks are added to
     :param float radius_polygon: nominal radius of the ring
     :param int net_code: id of net as returned by GetNetCode()
     :param int layer: interger code of layer on pcb
+    :param int positions: number of positions of the clock face
     :return None:
     """
-    add_track_arc(radius_polygon, 0, 61, net_code, layer)
+    add_track_arc(plan, radius_polygon, 0, positions + 1, net_code, layer, positions)
 
 
-def add_via(position, net_code):
+def add_via(plan, position, net_code):
     """Add a via with net at position. Returns the created via.
 
-    :param pcbnew.wxPoint position:
+    :param RoutingPlan plan: plan the via is added to
+    :param Point position:
     :param int net_code: id of net as returned by GetNetCode()
-    :return pcbnew.VIA:
+    :return Via:
     """
-    v = pcbnew.VIA(pcb)
-    pcb.Add(v)
-    v.SetPosition(position)
-    v.SetWidth(300000)
-    v.SetDrill(200000)
-    v.SetViaType(pcbnew.VIA_THROUGH)
-    v.SetLayerPair(layer_table_rev.get("F.Cu"), layer_table_rev.get("B.Cu"))
-    v.SetNetCode(net_code)
-    return v
-
-
-def digit_u_connect(pad_a, pad_b, distance):
+    profiling.count("add_via")
+    return plan.add_via(position, net_code)
+
+
+def digit_u_connect(plan, pad_a, pad_b, distance):
     """Connect two pads with a U shaped track and via combination.
 
     The horizontal lines are on the bottom and the vertical lines are on the top layer.
 
+    :param RoutingPlan plan: plan the tracks and vias are added to
     :param pad_a: one pad to connect
     :param pad_b: other pad to connect
     :param distance: distance of the horizontal line to the pad
-    :return pcbnew.VIA: via further away from the center
+    :return Via: via further away from the center
     """
     net_code = pad_a.GetNetCode()
     assert net_code == pad_b.GetNetCode()  # simple consistency check
-    pad_a_loc = pad_a.GetPosition()
-    pad_b_loc = pad_b.GetPosition()
-    via_a_loc = pcbnew.wxPointMM(
-        pad_a_loc[0] / 1000000.0, pad_a_loc[1] / 1000000.0 + distance
-    )
-    via_b_loc = pcbnew.wxPointMM(
-        pad_b_loc[0] / 1000000.0, pad_b_loc[1] / 1000000.0 + distance
-    )
-    add_track(pad_a_loc, via_a_loc, net_code, layer_table_rev.get("F.Cu"))
-    via_a = add_via(via_a_loc, net_code)
-    add_track(via_a_loc, via_b_loc, net_code, layer_table_rev.get("B.Cu"))
-    via_b = add_via(via_b_loc, net_code)
-    add_track(via_b_loc, pad_b_loc, net_code, layer_table_rev.get("F.Cu"))
-    if math.fabs(via_a_loc[0]) <= math.fabs(via_b_loc[0]):
+    pad_a_loc = as_point(pad_a.GetPosition())
+    pad_b_loc = as_point(pad_b.GetPosition())
+    via_a_loc = offset_mm(pad_a_loc, dy=distance)
+    via_b_loc = offset_mm(pad_b_loc, dy=distance)
+    add_track(plan, pad_a_loc, via_a_loc, net_code, plan.layer("F.Cu"))
+    via_a = add_via(plan, via_a_loc, net_code)
+    add_track(plan, via_a_loc, via_b_loc, net_code, plan.layer("B.Cu"))
+    via_b = add_via(plan, via_b_loc, net_code)
+    add_track(plan, via_b_loc, pad_b_loc, net_code, plan.layer("F.Cu"))
+    if abs(via_a_loc.x) <= abs(via_b_loc.x):
         return via_b
     else:
         return via_a
 
 
-def get_ring_intersection(radius_polygon, slope, left_neg_1_right_1):
+@functools.lru_cache(maxsize=GEOMETRY_CACHE_SIZE)
+def get_ring_intersection(
+    radius_polygon, slope, left_neg_1_right_1, positions=clock_geometry.CLOCK_POSITIONS
+):
     """Get one of the points, where a line through the center intersect the ring.
 
+    The routing asks for the same few intersections (per net radius and clock
+    position) again and again, so the points are memoized, see clear_geometry_cache().
+
     :param float radius_polygon: nominal radius of the ring
     :param float slope: slope of the line
     :param int left_neg_1_right_1: -1 left side (x<0), +1 right side (x>)
-    :return pcbnew.wxPoint:
+    :param int positions: number of positions (polygon segments) of the ring
+    :return Point:
     """
-    m = slope
+    tan_m = math.tan(slope)
     r = radius_polygon
-    alpha = math.pi / 60
-    epsilon = math.tan(m) % (alpha * 2)
+    alpha = math.pi / positions
+    epsilon = tan_m % (alpha * 2)
     b = math.cos(alpha) * r
     d = b / math.cos(alpha - epsilon)
-    ring_x_point = math.cos(math.tan(m)) * d * left_neg_1_right_1
-    ring_y_point = math.sin(math.tan(m)) * d * left_neg_1_right_1
-    return pcbnew.wxPointMM(ring_x_point, ring_y_point)
+    ring_x_point = math.cos(tan_m) * d * left_neg_1_right_1
+    ring_y_point = math.sin(tan_m) * d * left_neg_1_right_1
+    return point_mm(ring_x_point, ring_y_point)
 
 
-def get_ring_intersection_by_position(radius_polygon, position):
+@functools.lru_cache(maxsize=GEOMETRY_CACHE_SIZE)
+def get_ring_intersection_by_position(
+    radius_polygon, position, positions=clock_geometry.CLOCK_POSITIONS
+):
     """Get the point where a ray from the center of the ring intersect a clock position.
 
     :param float radius_polygon: nominal radius of the ring
-    :param float position: clock position [0, ..., 60]
-    :return pcbnew.wxPoint:
+    :param float position: clock position [0, ..., positions]
+    :param int positions: number of positions (polygon segments) of the ring
+    :return Point:
+    """
+    m = math.atan(position * math.pi * 2 / positions - math.pi / 2)
+    return get_ring_intersection(radius_polygon, m, 1, positions)
+
+
+def clear_geometry_cache():
+    """Forget the memoized ring intersections.
+
+    The points are keyed by all arguments (radius, slope or position and number of
+    positions), so changed ring parameters never hit a stale point. Clearing bounds the
+    memory between boards and is needed after the geometry code is changed at runtime.
+
+    :return None:
     """
-    m = math.atan(position * math.pi / 30 - math.pi / 2)
-    return get_ring_intersection(radius_polygon, m, 1)
+    get_ring_intersection.cache_clear()
+    get_ring_intersection_by_position.cache_clear()
 
 
-def add_track_with_intersection(position_on_circle, target_pad_position, net_code):
+def add_track_with_intersection(
+    plan, position_on_circle, target_pad_position, net_code
+):
     """Connects a position with a vertical line from the position and ray to the ring.
 
+    :param RoutingPlan plan: plan the tracks and via are added to
     :param position_on_circle:
     :param target_pad_position:
     :param net_code:
@@ -227,13 +302,29 @@ def add_track_with_intersection(position_on_circle, target_pad_position, net_cod
     """
     m = position_on_circle[1] / position_on_circle[0]
     t = add_track(
+        plan,
         position_on_circle,
-        pcbnew.wxPoint(target_pad_position[0], target_pad_position[0] * m),
+        Point(target_pad_position[0], int(target_pad_position[0] * m)),
         net_code,
-        layer_table_rev.get("F.Cu"),
+        plan.layer("F.Cu"),
     )
-    add_via(t.GetEnd(), net_code)
-    add_track(t.GetEnd(), target_pad_position, net_code, layer_table_rev.get("B.Cu"))
+    add_via(plan, t.end, net_code)
+    add_track(plan, t.end, target_pad_position, net_code, plan.layer("B.Cu"))
+
+
+def apply_placements(modules, placements):
+    """Move and rotate the modules on the board.
+
+    :param dict modules: reference -> module
+    :param dict placements: reference -> (Point position, orientation (0.1 deg) or None)
+    :return None:
+    """
+    for reference, (position, orientation) in placements.items():
+        module = modules[reference]
+        if orientation is not None:  # else do nothing
+            module.SetOrientation(orientation)
+        # use the point type of the board, pcbnew.wxPoint for pcbnew boards
+        module.SetPosition(type(module.GetPosition())(*position))
 
 
 def regex_split_annotation(str_):
@@ -246,386 +337,557 @@ def regex_split_annotation(str_):
     return a, int(i)
 
 
-if __name__ == "__main__":
+def load_board(path, backend="pcbnew"):
+    """Load a board file.
+
+    :param str path: .kicad_pcb file
+    :param str backend: "pcbnew" loads with pcbnew, "sexpr" with kicad_pcb_parser
+    :return: pcbnew.BOARD or kicad_pcb_parser.KicadPcb
+    """
+    if backend == "sexpr":
+        return kicad_pcb_parser.load_board(path)
+    import pcbnew
 
-    # Load pcbnew file
-    pcb = pcbnew.LoadBoard("StudioClock.kicad_pcb")
+    pcb = pcbnew.LoadBoard(path)
     pcb.BuildListOfNets()  # needed fo load file
+    return pcb
+
 
-    layer_table = {}
-    layer_table_rev = {}
-    for num in range(51):
-        print(num)
-        layer_table[num] = pcb.GetLayerName(num)
-        layer_table_rev[pcb.GetLayerName(num)] = num
+def load_parameters(path):
+    """Load keyword arguments of generate_board() from a TOML or JSON file.
+
+    :param str path: .toml file or .json file with an object of parameter name -> value
+    :return dict: parameter name -> value
+    :raises ValueError: if the file is no JSON object or has unknown parameters
+    """
+    if path.endswith(".toml"):
+        try:
+            import tomllib
+        except ImportError:  # Python < 3.11
+            import tomli as tomllib
+
+        with open(path, "rb") as f:
+            parameters = tomllib.load(f)
+    else:
+        with open(path) as f:
+            parameters = json.load(f)
+    if not isinstance(parameters, dict):
+        raise ValueError(f"{path}: parameters have to be a JSON object")
+    known = set(inspect.signature(generate_board).parameters) - {"pcb"}
+    unknown = sorted(set(parameters) - known)
+    if unknown:
+        raise ValueError(f"{path}: unknown parameters {', '.join(unknown)}")
+    return parameters
+
+
+def save_board(pcb, plan, placements, output_path, backend="pcbnew", incremental=False):
+    """Save the placed and routed board.
+
+    The fingerprints of all nets are stored next to the saved board. In incremental
+    mode only the nets whose fingerprint changed since the input board was saved are
+    deleted and regenerated, the tracks and vias of all other nets are kept.
+
+    :param pcb: board as returned by load_board()
+    :param RoutingPlan plan: generated tracks, vias and drawings
+    :param dict placements: reference -> (position, orientation)
+    :param str output_path: .kicad_pcb file to write
+    :param str backend: "pcbnew" saves with pcbnew, "sexpr" with kicad_pcb_writer
+    :param bool incremental: only regenerate the nets which changed
+    :return None:
+    """
+    profiling.phase("save")
+    pads = pcb.GetPads() if plan.pads is None else plan.pads
+    fingerprints, net_codes = net_fingerprints.fingerprint_nets(plan, pads)
+    previous = {}
+    if incremental:
+        previous = net_fingerprints.load_fingerprints(pcb.GetFileName())
+    changed = net_fingerprints.changed_nets(previous, fingerprints)
+    changed_codes = {net_codes[name] for name in changed if name in net_codes}
+    redraw = net_fingerprints.DRAWINGS_KEY in changed
+    log.info(
+        "regenerating %d of %d nets (incl. drawings)", len(changed), len(fingerprints)
+    )
+    if len(changed) < len(fingerprints):
+        plan = plan.subset(changed_codes, drawings=redraw)
+
+    if backend == "sexpr":
+        kicad_pcb_writer.write_board(
+            pcb.path,
+            output_path,
+            plan,
+            placements,
+            keep_net_codes=set(net_codes.values()) - changed_codes if previous else (),
+            keep_drawings=not redraw,
+        )
+    else:
+        # delete old, existing drawings, the old tracks (of the changed nets) are
+        # reused for the new ones
+        profiling.phase("delete")
+        tracks = [
+            track
+            for track in pcb.GetTracks()
+            if not previous or track.GetNetCode() in changed_codes
+        ]
+        if redraw:
+            drawings = list(pcb.GetDrawings())
+            log.info("deleting %d drawings", len(drawings))
+            for d in drawings:
+                pcb.Remove(d)
+        profiling.phase("save")
+        reused = commit_plan(plan, pcb, tracks)
+        log.info("reused %d of %d tracks, deleted the others", reused, len(tracks))
+        pcb.Save(output_path)
+    net_fingerprints.save_fingerprints(output_path, fingerprints)
+
+
+def generate_board(
+    pcb,
+    Radius=42,  # noqa: N803
+    radius_hours=None,
+    pcb_dimension_length=100,
+    digit_space=3,
+    digit_orientation=2700,
+    positions=clock_geometry.CLOCK_POSITIONS,
+    hour_markers=12,
+    net_norm_distance_dict=None,
+    k15_track_x=1.27,
+    anode_via_offset=3,
+    netlist=None,
+):
+    """Place the modules and route the clock on a loaded board.
+
+    The board has one LED per clock position on the outer ring, followed (in the order
+    of the references) by the hour markers and the two separation LEDs of the digits.
+    There is one cathode ring per cathode net (k0, k1, ...) of the board. The fixed
+    clock positions of the anode routing are given for 60 positions and scaled.
+
+    :param pcb: board as returned by load_board()
+    :param float Radius: radius of the second LEDs (mm)
+    :param float radius_hours: radius of the hour LEDs (mm), default Radius * 1.1
+    :param float pcb_dimension_length: edge length of the square board (mm)
+    :param float digit_space: space between the digits (mm)
+    :param digit_orientation: orientation of the digits (0.1 deg), None keeps it
+    :param int positions: number of LEDs of the outer ring (clock positions)
+    :param int hour_markers: number of hour marker LEDs, a divisor of positions
+    :param dict net_norm_distance_dict: digit net -> distance (mm / 1.4) of its U
+        connection to the digit pads, overrides of NET_NORM_DISTANCES
+    :param float k15_track_x: x of the vertical k15 track to the separation LEDs (mm)
+    :param float anode_via_offset: distance of the digit anode vias above the pads (mm)
+    :param str netlist: netlist (.net) to group the modules by footprint and value,
+        None groups them by the reference prefix of the board modules
+    :return tuple: (RoutingPlan, placements as reference -> (position, orientation))
+    :raises ValueError: if positions or hour_markers are < 1 or do not fit, if there is
+        no space for the tracks between the LEDs, or if the board has not 2 connectors
+    """
+    if positions < 1 or hour_markers < 1:
+        raise ValueError(
+            f"{positions} positions and {hour_markers} hour markers have to be >= 1"
+        )
+    if positions % hour_markers:
+        raise ValueError(f"{hour_markers} hour markers do not divide {positions}")
+    hour_step = positions // hour_markers
+    scale = positions / clock_geometry.CLOCK_POSITIONS
+
+    def scaled(clock_position):
+        """Map a clock position of the 60 position layout to the number of positions.
+
+        Half positions lie between two LEDs and stay between the corresponding LEDs.
+        """
+        if clock_position % 1:
+            return (clock_position + 0.5) * scale - 0.5
+        return clock_position * scale
+
+    def between_leds(clock_position, away_from=0):
+        """Move a clock position to the nearest half position (between two LEDs).
+
+        A position on an LED moves away from the clock position away_from, so tracks
+        mirrored at the connectors stay mirrored and do not come closer to them.
+        """
+        if clock_position % 1:
+            return math.floor(clock_position) + 0.5
+        offset = (clock_position - away_from) % positions
+        return clock_position + (0.5 if offset < positions / 2 else -0.5)
+
+    # collect layer names
+    profiling.phase("layer table")
+    layer_table_rev = {pcb.GetLayerName(num): num for num in range(51)}
 
     # set parameters
-    Radius = 42
-    pcb_dimension_length = 100
     radius_seconds = Radius
-    radius_hours = Radius * 1.1
+    if radius_hours is None:
+        radius_hours = Radius * 1.1
 
-    digit_space = 3
     # only change when digit footprint changes
     digit_width = 10
     digit_high = 10
-    digit_orientation = 2700
 
     # note assumes dict are ordered, which they are in python3.9
 
-    # collect layer names
-    for num in range(51):
-        print(num)
-        layer_table[num] = pcb.GetLayerName(num)
-        layer_table_rev[pcb.GetLayerName(num)] = num
-        # print("{} {}".format(i, pcb.GetLayerName(i)))
-
-    # delete old, existing tracks and drawings
-    print(f"deleting {len(list(pcb.GetTracks()))} tracks")
-    for track in pcb.GetTracks():
-        pcb.Delete(track)
-    print(f"deleting {len(list(pcb.GetDrawings()))} drawings")
-    for d in pcb.GetDrawings():
-        pcb.Remove(d)
+    plan = RoutingPlan(layer_table_rev)
 
     # collect and sort modules into groups (second, hour, digit, seperator, connector)
+    profiling.phase("placement")
     modules = {mod.GetReference(): mod for mod in sorted(pcb.GetModules())}
-    modules_seconds = {k: modules[k] for k in ["D" + str(i) for i in range(1, 60 + 1)]}
-    modules_hours = {k: modules[k] for k in ["D" + str(i) for i in range(61, 72 + 1)]}
-    modules_digit = {k: modules[k] for k in ["U" + str(i) for i in range(1, 4 + 1)]}
-    modules_separation = {k: modules[k] for k in ["D" + str(i) for i in [73, 74]]}
-    modules_connector = {k: modules[k] for k in ["J" + str(i) for i in [1, 2]]}
-
-    # collect and sort nets into groups (anode, cathode)
-    nets = collections.defaultdict(list)
-    for mod in modules.values():
-        for pad in mod.Pads():
-            nets[pad.GetShortNetname()].append(pad)
-    nets_cathode = {k: v for k, v in nets.items() if k.startswith("k")}
-    nets_anode = {k: v for k, v in nets.items() if k.startswith("a")}
+    if netlist:
+        components, netlist_nets = kicad_netlist.read_netlist(netlist)
+        missing = sorted(set(components) - set(modules))
+        if missing:
+            raise ValueError(f"modules of {netlist} missing on the board: {missing}")
+    else:
+        components = kicad_netlist.components_from_references(modules)
+    groups = kicad_netlist.group_components(components, positions, hour_markers)
+    modules_seconds = {c.ref: modules[c.ref] for c in groups["seconds"]}
+    modules_hours = {c.ref: modules[c.ref] for c in groups["hours"]}
+    modules_digit = {c.ref: modules[c.ref] for c in groups["digits"]}
+    modules_separation = {c.ref: modules[c.ref] for c in groups["separation"]}
+    modules_connector = {c.ref: modules[c.ref] for c in groups["connectors"]}
+    # LED reference -> (group, number in the group), looked up per pad by the routing
+    led_roles = {
+        c.ref: (group, number)
+        for group in ("seconds", "hours")
+        for number, c in enumerate(groups[group])
+    }
+    if len(modules_connector) != 2:
+        raise ValueError(f"2 connectors expected, found {list(modules_connector)}")
+    # the second connector (by reference) carries the anode nets
+    anode_connector = list(modules_connector)[1]
+
+    # calculate the placement of all modules: reference -> (position, orientation)
+    placements = {}
 
     # position the second modules in a circle
-    for key, value in modules_seconds.items():
-        _, i = regex_split_annotation(key)
-        value.SetOrientation((calc_deg_angle_from_clock_position(i - 1) - 90) * 10)
-        value.SetPosition(
-            calc_xy_location_from_clock_position_WxPoint(radius_seconds, i - 1)
-        )
-        print(
-            "Placed: Second %s at %s with rot %s"
-            % (
-                key,
-                str(value.GetPosition()),
-                str(value.GetOrientation()),
-            )
+    locations_seconds = clock_geometry.ring_vertices_nm(
+        radius_seconds, positions
+    ).tolist()
+    for i, key in enumerate(modules_seconds):
+        placements[key] = (
+            Point(*locations_seconds[i]),
+            (calc_deg_angle_from_clock_position(i, positions) - 90) * 10,
         )
+        log.debug("Placed: Second %s at %s with rot %s", key, *placements[key])
 
     # position the hour modules in a circle
-    for key, value in modules_hours.items():
-        _, i = regex_split_annotation(key)
-        value.SetOrientation(
-            (calc_deg_angle_from_clock_position((i - 61) * 5) - 90) * 10
-        )
-        value.SetPosition(
-            calc_xy_location_from_clock_position_WxPoint(radius_hours, (i - 61) * 5)
-        )
-        print(
-            "Placed: Hour %s at %s with rot %s"
-            % (
-                key,
-                str(value.GetPosition()),
-                str(value.GetOrientation()),
-            )
+    locations_hours = clock_geometry.ring_vertices_nm(radius_hours, positions).tolist()
+    for i, key in enumerate(modules_hours):
+        pos = i * hour_step
+        placements[key] = (
+            Point(*locations_hours[pos]),
+            (calc_deg_angle_from_clock_position(pos, positions) - 90) * 10,
         )
+        log.debug("Placed: Hour %s at %s with rot %s", key, *placements[key])
 
     # position the digit and digit seperator modules (4x7seg, 2xled)
-    for key, value in modules_digit.items():
-        _, i = regex_split_annotation(key)
-        value.SetPosition(
-            pcbnew.wxPointMM(
+    for i, key in enumerate(modules_digit):
+        placements[key] = (
+            point_mm(
                 [
                     -1.5 - digit_space / digit_width * 2,
                     -0.5 - digit_space / digit_width,
                     0.5 + digit_space / digit_width,
                     1.5 + digit_space / digit_width * 2,
-                ][i - 1]
+                ][i]
                 * digit_width,
                 0,
-            )
+            ),
+            digit_orientation,  # None keeps the orientation
         )
+        log.debug("Placed: Digit %s at %s", key, placements[key][0])
 
-        if digit_orientation is not None:  # else do nothing
-            value.SetOrientation(digit_orientation)
-        print("Placed: Digit %d at %s" % (i, str(value.GetPosition())))
-
-    for key, module in modules_separation.items():
-        _, i = regex_split_annotation(key)  # TODO fix one must be plus
-        sign = 1 if key == "D73" else -1
-        module.SetPosition(pcbnew.wxPointMM(0, sign * digit_high * 0.4))
-        module.SetOrientation(2700)
-        print("Placed: Seperator %s at %s" % (key, str(module.GetPosition())))
+    for i, key in enumerate(modules_separation):
+        sign = 1 if i == 0 else -1
+        placements[key] = (point_mm(0, sign * digit_high * 0.4), 2700)
+        log.debug("Placed: Seperator %s at %s", key, placements[key][0])
 
     # position the two connector modules on the back of the clock
-    for key, module in modules_connector.items():
-        _, i = regex_split_annotation(key)
-        sign = -1 if key == "J1" else 1
-        module.SetPosition(pcbnew.wxPointMM(0, sign * digit_high * 1.5))
-        module.SetOrientation(2700)
-        # module.Se # TODO change front to back side
-        print("Placed: Connector %s at %s" % (key, str(module.GetPosition())))
+    for i, key in enumerate(modules_connector):
+        sign = -1 if i == 0 else 1
+        # TODO change front to back side
+        placements[key] = (point_mm(0, sign * digit_high * 1.5), 2700)
+        log.debug("Placed: Connector %s at %s", key, placements[key][0])
+
+    apply_placements(modules, placements)
+
+    # read the placed pads once, the routing only uses the snapshot
+    pads = board_snapshot.snapshot_pads(modules.values())
+    plan.pads = pads
+    pads_by_module = collections.defaultdict(list)
+    # collect and sort nets into groups (anode, cathode)
+    nets = collections.defaultdict(list)
+    for pad in pads:
+        pads_by_module[pad.module.reference].append(pad)
+        nets[pad.net_name].append(pad)
+    if netlist:
+        # single pin nets of the netlist are unconnected pins without net on the board
+        pad_nets = {
+            (ref, pin): name
+            for name, nodes in netlist_nets.items()
+            if len(nodes) > 1
+            for ref, pin in nodes
+        }
+        outdated = [
+            pad
+            for pad in pads
+            if pad_nets.get((pad.module.reference, pad.name), "") != pad.net_name
+        ]
+        if outdated:
+            log.warning(
+                "%d pads have another net than in %s, update the board: %s",
+                len(outdated),
+                netlist,
+                outdated[:5],
+            )
+    nets_cathode = {k: v for k, v in nets.items() if k.startswith("k")}
+    nets_anode = {k: v for k, v in nets.items() if k.startswith("a")}
+    rings = len(nets_cathode)  # one cathode ring per net
+    # the connector and hour tracks run between the LED tracks down to the rings
+    gap = radius_from_net_number(-1, Radius, rings) * math.sin(math.pi / positions)
+    if gap * clock_geometry.IU_PER_MM < TRACK_WIDTH + board_checks.CLEARANCE:
+        raise ValueError(
+            f"{positions} positions do not leave space for the tracks between the "
+            f"LEDs of the cathode rings with a radius of {Radius} mm"
+        )
 
     # set the pcb size
+    profiling.phase("board outline")
     _pcb_corners = [[-1, -1], [-1, 1], [1, 1], [1, -1]]
-    print(
-        "Setting Board Dimensions too:"
-        + str(pcb_dimension_length)
-        + "x"
-        + str(pcb_dimension_length)
+    log.debug(
+        "Setting Board Dimensions to: %sx%s", pcb_dimension_length, pcb_dimension_length
     )
-    tmp_print = []
     for i in range(4):
-        seg = pcbnew.DRAWSEGMENT(pcb)
-        pcb.Add(seg)
-        seg.SetStart(
-            pcbnew.wxPointMM(
+        seg = plan.add_drawing(
+            point_mm(
                 _pcb_corners[i][0] * pcb_dimension_length / 2,
                 _pcb_corners[i][1] * pcb_dimension_length / 2,
-            )
-        )
-        seg.SetEnd(
-            pcbnew.wxPointMM(
+            ),
+            point_mm(
                 _pcb_corners[(i + 1) % 4][0] * pcb_dimension_length / 2,
                 _pcb_corners[(i + 1) % 4][1] * pcb_dimension_length / 2,
-            )
+            ),
+            layer_table_rev.get("Edge.Cuts"),
         )
-        seg.SetLayer(layer_table_rev.get("Edge.Cuts"))
-        tmp_print.append(seg.GetStart())
-    print("Board Corners:" + str(tmp_print))
+        log.debug("Board Corner: %s", seg.start)
 
     # draw the cathode tracks of the digit (using modules as base for drawing)
-    print(
-        f"Connecting Digits {[x.GetReference() for x in modules_digit.values()]} "
-        f"and Separation LEDs {[x.GetReference() for x in modules_separation.values()]}"
-        f" with Nets"
-    )
-    net_norm_distance_dict = dict(
-        k0=-3,
-        k1=3,
-        k2=-4,
-        k3=4,
-        k4=-5,
-        k5=5,
-        k6=-6,
-        k7=6,
-        k8=-3,
-        k9=-4,
-        k10=4,
-        k11=-5,
-        k12=5,
-        k13=-6,
-        k14=6,
-        k15=3,
+    profiling.phase("digit routing")
+    log.debug(
+        "Connecting Digits %s and Separation LEDs %s with Nets",
+        list(modules_digit),
+        list(modules_separation),
     )
+    net_norm_distance_dict = {**NET_NORM_DISTANCES, **(net_norm_distance_dict or {})}
     pads_dict = collections.defaultdict(dict)
     for i, key in enumerate(modules_digit):
-        for pad in modules_digit[key].Pads():
-            pads_dict[i][int(pad.GetPadName())] = pad
+        for pad in pads_by_module[key]:
+            pads_dict[i][int(pad.name)] = pad
         pads_dict[i].pop(3)
         pads_dict[i].pop(8)
     outer_location = 0
 
     net_digit_via_dict = dict()
     for i in pads_dict[0].keys():
-        net_short_name = pads_dict[0][i].GetNet().GetShortNetname()
+        net_short_name = pads_dict[0][i].net_name
         net_digit_via_dict[net_short_name] = digit_u_connect(
+            plan,
             pads_dict[0][i],
             pads_dict[1][i],
             net_norm_distance_dict[net_short_name] * 1.4,
         )
-        net_short_name = pads_dict[2][i].GetNet().GetShortNetname()
+        net_short_name = pads_dict[2][i].net_name
         net_digit_via_dict[net_short_name] = digit_u_connect(
+            plan,
             pads_dict[2][i],
             pads_dict[3][i],
             net_norm_distance_dict[net_short_name] * 1.4,
         )
 
-    outer_location = max(v.GetPosition().x for v in net_digit_via_dict.values())
+    outer_location = max(v.position.x for v in net_digit_via_dict.values())
     for net_name, via in net_digit_via_dict.items():
-        net_side = np.sign(via.GetPosition().x)
-        if abs(via.GetPosition().x) < outer_location:
+        net_side = 1 if via.position.x > 0 else -1
+        if abs(via.position.x) < outer_location:
             t = add_track(
-                via.GetPosition(),
-                pcbnew.wxPoint(
-                    int(outer_location * net_side),
-                    via.GetPosition().y,
-                ),
-                via.GetNetCode(),
+                plan,
+                via.position,
+                Point(outer_location * net_side, via.position.y),
+                via.net_code,
                 layer_table_rev.get("B.Cu"),
             )
-            via = add_via(t.GetEnd(), t.GetNetCode())
+            via = add_via(plan, t.end, t.net_code)
             net_digit_via_dict[net_name] = via
         num = regex_split_annotation(net_name)[1]
         if net_name == "k15":
             num = -1
-        r = radius_from_net_number(num)
-        m = via.GetPosition().y / outer_location * net_side
+        r = radius_from_net_number(num, Radius, rings)
+        m = via.position.y / outer_location * net_side
         t = add_track(
-            via.GetPosition(),
-            get_ring_intersection(r, m, int(np.sign(via.GetPosition().x))),
-            via.GetNetCode(),
+            plan,
+            via.position,
+            get_ring_intersection(r, m, net_side, positions),
+            via.net_code,
             layer_table_rev.get("F.Cu"),
         )
-        add_via(t.GetEnd(), t.GetNetCode())
+        add_via(plan, t.end, t.net_code)
 
     # draw the cathode tracks connecting the separation leds to k15
-    k15_vias = [
-        track
-        for track in pcb.GetTracks()
-        if isinstance(track, pcbnew.VIA) and track.GetNet().GetShortNetname() == "k15"
-    ]
-    k15_via = (
-        k15_vias[0]
-        if k15_vias[0].GetPosition().x < k15_vias[1].GetPosition().x
-        else k15_vias[1]
-    )
+    # (choose between the two most recently added k15 vias)
+    profiling.phase("k15 routing")
+    k15_vias = plan.vias_on_net(net_digit_via_dict["k15"].net_code)
+    k15_via = min(k15_vias[-2:], key=lambda via: via.position.x)
     k15_led_pads = [
-        pad
-        for pad in pcb.GetPads()
-        if pad.GetNet().GetShortNetname() == "k15"
-        and pad.GetParent().GetReference().startswith("D")
+        pad for pad in nets["k15"] if pad.module.reference in modules_separation
     ]
     t = add_track(
-        k15_via.GetPosition(),
-        pcbnew.wxPoint(1270000, k15_via.GetPosition().y),
-        k15_via.GetNetCode(),
+        plan,
+        k15_via.position,
+        offset_mm((0, k15_via.position.y), dx=k15_track_x),
+        k15_via.net_code,
         layer_table_rev.get("B.Cu"),
     )
     t = add_track(
-        t.GetEnd(),
-        pcbnew.wxPoint(
-            t.GetEnd().x, max([pad.GetPosition().y for pad in k15_led_pads])
-        ),
-        t.GetNetCode(),
-        t.GetLayer(),
+        plan,
+        t.end,
+        Point(t.end.x, max([pad.GetPosition().y for pad in k15_led_pads])),
+        t.net_code,
+        t.layer,
     )
     for pad_ in k15_led_pads:
-        v = add_via(pcbnew.wxPoint(t.GetEnd().x, pad_.GetPosition().y), t.GetNetCode())
+        v = add_via(plan, Point(t.end.x, pad_.GetPosition().y), t.net_code)
         add_track(
+            plan,
             pad_.GetPosition(),
-            v.GetPosition(),
-            t.GetNetCode(),
+            v.position,
+            t.net_code,
             layer_table_rev.get("F.Cu"),
         )
 
     # draw the cathode tracks of ring leds (iterating over all nets)
+    profiling.phase("cathode rings")
     for key, value in nets_cathode.items():
         prefix, num = regex_split_annotation(key)
         if key == "k15":
             num = -1
-        r = radius_from_net_number(num)
-        print("Adding Net:", str(key), "with radius", str(r))
-        add_track_ring(r, value[0].GetNetCode(), layer_table_rev.get("B.Cu"))
+        r = radius_from_net_number(num, Radius, rings)
+        log.debug("Adding Net: %s with radius %s", key, r)
+        add_track_ring(
+            plan, r, value[0].GetNetCode(), layer_table_rev.get("B.Cu"), positions
+        )
+        ring_vertices = clock_geometry.ring_vertices_nm(r, positions).tolist()
         for pad in value:
-            module_ref = regex_split_annotation(pad.GetParent().GetReference())
-            if module_ref[0] == "D" and module_ref[1] <= 60:  # seconds
-                corner_location = calc_xy_location_from_clock_position_WxPoint(
-                    r, module_ref[1] - 1
-                )
+            group, number = led_roles.get(pad.module.reference, (None, None))
+            if group == "seconds":
+                corner_location = Point(*ring_vertices[number])
                 add_track(
+                    plan,
                     pad.GetPosition(),
                     corner_location,
                     pad.GetNetCode(),
                     layer_table_rev.get("F.Cu"),
                 )
-                add_via(corner_location, pad.GetNetCode())
-            elif module_ref[0] == "D" and module_ref[1] <= 72:  # hours
-                radius = math.sqrt(
-                    (
-                        math.pow(pad.GetPosition()[0], 2)
-                        + math.pow(pad.GetPosition()[1], 2)
-                    )
-                ) / math.pow(10, 6)
-                pos = module_ref[1] % 61 * 5
+                add_via(plan, corner_location, pad.GetNetCode())
+            elif group == "hours":
+                radius = distance_mm(pad.GetPosition())
+                hour = number
+                pos = hour * hour_step
+                # between two hour markers, the connector tracks of the hours 0,
+                # hour_markers - 2 and hour_markers - 1 end at the same position
+                pos_between = between_leds(pos + hour_step / 2)
                 t1 = add_track_arc(
-                    radius, pos, pos + 2, pad.GetNetCode(), layer_table_rev.get("F.Cu")
+                    plan,
+                    radius,
+                    pos,
+                    pos + hour_step * 2 // 5,
+                    pad.GetNetCode(),
+                    layer_table_rev.get("F.Cu"),
+                    positions,
                 )[1]
                 t3 = add_track(
-                    get_ring_intersection_by_position(radius, pos + 2.5),
-                    get_ring_intersection_by_position(radius - 4, pos + 2.5),
+                    plan,
+                    get_ring_intersection_by_position(radius, pos_between, positions),
+                    get_ring_intersection_by_position(
+                        radius - 4, pos_between, positions
+                    ),
                     pad.GetNetCode(),
                     layer_table_rev.get("B.Cu"),
                 )
                 t4 = add_track(
-                    t3.GetEnd(),
+                    plan,
+                    t3.end,
                     get_ring_intersection_by_position(
-                        radius_from_net_number(num), pos + 2.5
+                        radius_from_net_number(num, Radius, rings),
+                        pos_between,
+                        positions,
                     ),
                     pad.GetNetCode(),
                     layer_table_rev.get("F.Cu"),
                 )
                 t2 = add_track(
-                    t1.GetEnd(),
-                    t3.GetStart(),
+                    plan,
+                    t1.end,
+                    t3.start,
                     pad.GetNetCode(),
                     layer_table_rev.get("F.Cu"),
                 )
-                add_via(t2.GetEnd(), pad.GetNetCode())
-                add_via(t3.GetEnd(), pad.GetNetCode())
-                if module_ref[1] not in [61, 71, 72]:
-                    add_via(t4.GetEnd(), pad.GetNetCode())
-            elif module_ref[0] == "J":  # connectors
+                add_via(plan, t2.end, pad.GetNetCode())
+                add_via(plan, t3.end, pad.GetNetCode())
+                if hour not in [0, hour_markers - 2, hour_markers - 1]:
+                    add_via(plan, t4.end, pad.GetNetCode())
+            elif pad.module.reference in modules_connector:
                 # (origin to layerSwitch): vertical track segment to change layer
-                via_point_y = pad.GetParent().GetPosition()[1] / 1000000.0 - 4.0
-                via_point_x = pad.GetPosition()[0] / 1000000.0
+                via_point = offset_mm(
+                    (pad.GetPosition()[0], pad.GetParent().GetPosition()[1]), dy=-4.0
+                )
                 add_track(
+                    plan,
                     pad.GetPosition(),
-                    pcbnew.wxPointMM(via_point_x, via_point_y),
+                    via_point,
                     pad.GetNetCode(),
                     layer_table_rev.get("B.Cu"),
                 )
-                add_via(pcbnew.wxPointMM(via_point_x, via_point_y), pad.GetNetCode())
-                # (layerSwitch to Ring) equation with slope
+                add_via(plan, via_point, pad.GetNetCode())
+                # (layerSwitch to Ring) equation with slope (the connector pads have
+                # a fixed pitch, independent of the number of clock positions)
                 angle_rad = (
-                    int(pad.GetPadName()) - 8 - 0.5
-                ) / 30 * math.pi - math.pi / 2
+                    between_leds((int(pad.GetPadName()) - 8.5) * scale)
+                    / positions
+                    * 2
+                    * math.pi
+                    - math.pi / 2
+                )
                 m = math.tan(angle_rad)
                 # (pad to Intersection):
                 # calculate intersection of y = x*m and y=constant=Y-Position of Pad
-                intersection_x = pad.GetPosition()[0] / 1000000.0
-                intersection_y = intersection_x * m
+                intersection = Point(via_point.x, int(via_point.x * m))
                 add_track(
-                    pcbnew.wxPointMM(via_point_x, via_point_y),
-                    pcbnew.wxPointMM(intersection_x, intersection_y),
+                    plan,
+                    via_point,
+                    intersection,
                     pad.GetNetCode(),
                     layer_table_rev.get("F.Cu"),
                 )
                 # (intersection to ring):
-                # math.cos(math.pi/60) adjust the length to polygon
-                ring_x_point = math.cos(angle_rad) * r * math.cos(math.pi / 60)
-                ring_y_point = math.sin(angle_rad) * r * math.cos(math.pi / 60)
+                # math.cos(math.pi/positions) adjust the length to polygon
+                ring_x_point = math.cos(angle_rad) * r * math.cos(math.pi / positions)
+                ring_y_point = math.sin(angle_rad) * r * math.cos(math.pi / positions)
                 add_track(
-                    pcbnew.wxPointMM(intersection_x, intersection_y),
-                    pcbnew.wxPointMM(ring_x_point, ring_y_point),
+                    plan,
+                    intersection,
+                    point_mm(ring_x_point, ring_y_point),
                     pad.GetNetCode(),
                     layer_table_rev.get("F.Cu"),
                 )
-                add_via(pcbnew.wxPointMM(ring_x_point, ring_y_point), pad.GetNetCode())
+                add_via(plan, point_mm(ring_x_point, ring_y_point), pad.GetNetCode())
 
     # draw the anode tracks (iterating over all nets)
+    profiling.phase("anode routing")
     for key, value in nets_anode.items():
-        print("Adding Net:", str(key))
+        log.debug("Adding Net: %s", key)
         prefix, num = regex_split_annotation(key)
         if num <= 3:  # 4 segments of the LED ring
             ring_pos = None
-            con_pad_pos = value[15].GetPosition()
-            radius = math.sqrt(
-                (
-                    math.pow(value[0].GetPosition()[0], 2)
-                    + math.pow(value[0].GetPosition()[1], 2)
-                )
-            ) / math.pow(10, 6)
+            con_pad_pos = value[positions // 4].GetPosition()
+            radius = distance_mm(value[0].GetPosition())
             for i in range(len(value) - 2):
                 add_track(
+                    plan,
                     value[i].GetPosition(),
                     value[i + 1].GetPosition(),
                     value[i].GetNetCode(),
@@ -633,89 +895,112 @@ if __name__ == "__main__":
                 )
             if num == 0:
                 t_start, t_stop = add_track_arc(
-                    radius_from_net_number(15),
-                    13.5,
-                    26.5,
+                    plan,
+                    radius_from_net_number(15, Radius, rings),
+                    scaled(13.5),
+                    scaled(26.5),
                     value[-1].GetNetCode(),
                     layer_table_rev.get("B.Cu"),
+                    positions,
                 )
 
                 t0 = add_track(
-                    get_ring_intersection_by_position(radius, 13.5),
-                    t_start.GetStart(),
+                    plan,
+                    get_ring_intersection_by_position(radius, scaled(13.5), positions),
+                    t_start.start,
                     value[-1].GetNetCode(),
                     layer_table_rev.get("F.Cu"),
                 )
-                add_via(t0.GetEnd(), t0.GetNetCode())
+                add_via(plan, t0.end, t0.net_code)
 
-                v = add_via(t_stop.GetEnd(), t_stop.GetNetCode())
-                ring_pos = v.GetPosition()
+                v = add_via(plan, t_stop.end, t_stop.net_code)
+                ring_pos = v.position
             if num == 1:
-                ring_pos = get_ring_intersection_by_position(radius, 28.5)
+                ring_pos = get_ring_intersection_by_position(
+                    radius, between_leds(28.5 * scale, positions / 2), positions
+                )
             if num == 2:
-                ring_pos = get_ring_intersection_by_position(radius, 31.5)
+                ring_pos = get_ring_intersection_by_position(
+                    radius, between_leds(31.5 * scale, positions / 2), positions
+                )
             if num == 3:
                 t_start, t_stop = add_track_arc(
-                    radius_from_net_number(15),
-                    46.5,
-                    33.5,
+                    plan,
+                    radius_from_net_number(15, Radius, rings),
+                    scaled(46.5),
+                    scaled(33.5),
                     value[-1].GetNetCode(),
                     layer_table_rev.get("B.Cu"),
+                    positions,
                 )
 
                 t0 = add_track(
-                    get_ring_intersection_by_position(radius, 46.5),
-                    t_start.GetStart(),
+                    plan,
+                    get_ring_intersection_by_position(radius, scaled(46.5), positions),
+                    t_start.start,
                     value[-1].GetNetCode(),
                     layer_table_rev.get("F.Cu"),
                 )
-                add_via(t0.GetEnd(), t0.GetNetCode())
+                add_via(plan, t0.end, t0.net_code)
 
-                v = add_via(t_stop.GetEnd(), t_stop.GetNetCode())
-                ring_pos = v.GetPosition()
-            add_track_with_intersection(ring_pos, con_pad_pos, value[0].GetNetCode())
+                v = add_via(plan, t_stop.end, t_stop.net_code)
+                ring_pos = v.position
+            add_track_with_intersection(
+                plan, ring_pos, con_pad_pos, value[0].GetNetCode()
+            )
         elif num == 4:
-            radius = math.sqrt(
-                (
-                    math.pow(value[0].GetPosition()[0], 2)
-                    + math.pow(value[0].GetPosition()[1], 2)
-                )
-            ) / math.pow(10, 6)
-            inner_radius = radius_from_net_number(-2)
-            add_track_ring(radius, value[0].GetNetCode(), layer_table_rev.get("F.Cu"))
+            radius = distance_mm(value[0].GetPosition())
+            inner_radius = radius_from_net_number(-2, Radius, rings)
+            add_track_ring(
+                plan,
+                radius,
+                value[0].GetNetCode(),
+                layer_table_rev.get("F.Cu"),
+                positions,
+            )
             t = add_track(
-                get_ring_intersection_by_position(radius, 29.5),
-                calc_xy_location_from_clock_position_WxPoint(inner_radius, 29.5),
+                plan,
+                get_ring_intersection_by_position(radius, scaled(29.5), positions),
+                calc_xy_location_from_clock_position_WxPoint(
+                    inner_radius, scaled(29.5), positions
+                ),
                 value[-1].GetNetCode(),
                 layer_table_rev.get("F.Cu"),
             )
-            v = add_via(t.GetEnd(), t.GetNetCode())
+            v = add_via(plan, t.end, t.net_code)
             t_start, t_stop = add_track_arc(
-                inner_radius, 36, 24, t.GetNetCode(), layer_table_rev.get("B.Cu")
+                plan,
+                inner_radius,
+                scaled(36),
+                scaled(24),
+                t.net_code,
+                layer_table_rev.get("B.Cu"),
+                positions,
             )
 
             def distance(wx1, wx2):
-                return np.sqrt(np.square(wx1.x - wx2.x) + np.square(wx1.y - wx2.y))
+                return math.hypot(wx1.x - wx2.x, wx1.y - wx2.y)
 
-            for pad in modules_connector["J2"].Pads():
-                if not pad.GetNet().GetShortNetname() == "a4":
+            for pad in nets["a4"]:
+                if pad.module.reference != anode_connector:
                     continue
-                dist1 = distance(pad.GetPosition(), t_start.GetStart())
-                dist2 = distance(pad.GetPosition(), t_stop.GetEnd())
+                dist1 = distance(pad.GetPosition(), t_start.start)
+                dist2 = distance(pad.GetPosition(), t_stop.end)
                 if dist1 < dist2:
-                    t_pos = t_start.GetStart()
+                    t_pos = t_start.start
                 else:
-                    t_pos = t_stop.GetEnd()
-                add_via(t_pos, pad.GetNetCode())
-                add_track_with_intersection(t_pos, pad.GetPosition(), pad.GetNetCode())
+                    t_pos = t_stop.end
+                add_via(plan, t_pos, pad.GetNetCode())
+                add_track_with_intersection(
+                    plan, t_pos, pad.GetPosition(), pad.GetNetCode()
+                )
         elif num in [50, 51, 60, 61]:  # TODO: Sort Values?
             pad_connector = next(
-                pad_
-                for pad_ in value
-                if pad_.GetParent().GetReference().startswith("J")
+                pad_ for pad_ in value if pad_.module.reference in modules_connector
             )
             value.remove(pad_connector)
             add_track(
+                plan,
                 value[0].GetPosition(),
                 value[1].GetPosition(),
                 value[0].GetNetCode(),
@@ -727,37 +1012,158 @@ if __name__ == "__main__":
                 pad_digit = value[1]
             # digit_u_connect(pad_digit, pad_connector, -2)
             v = add_via(
-                pcbnew.wxPoint(
-                    pad_digit.GetPosition()[0], pad_digit.GetPosition()[1] - 3000000
-                ),
+                plan,
+                offset_mm(pad_digit.GetPosition(), dy=-anode_via_offset),
                 pad_digit.GetNetCode(),
             )
             t = add_track(
-                v.GetEnd(),
-                pcbnew.wxPoint(
+                plan,
+                v.position,
+                Point(
                     pad_connector.GetPosition().x,
-                    v.GetPosition().y
-                    + abs(pad_connector.GetPosition().x - v.GetPosition().x),
+                    v.position.y + abs(pad_connector.GetPosition().x - v.position.x),
                 ),
                 value[0].GetNetCode(),
                 layer_table_rev.get("B.Cu"),
             )
-            add_track(
-                t.GetEnd(), pad_connector.GetPosition(), t.GetNetCode(), t.GetLayer()
-            )
+            add_track(plan, t.end, pad_connector.GetPosition(), t.net_code, t.layer)
         elif num in [11, 21]:
             t1 = add_track(
+                plan,
                 value[0].GetPosition(),
-                pcbnew.wxPoint(value[1].GetPosition()[0], value[0].GetPosition()[1]),
+                Point(value[1].GetPosition()[0], value[0].GetPosition()[1]),
                 value[0].GetNetCode(),
                 layer_table_rev.get("F.Cu"),
             )
-            v1 = add_via(t1.GetEnd(), value[0].GetNetCode())
+            v1 = add_via(plan, t1.end, value[0].GetNetCode())
             add_track(
-                v1.GetPosition(),
+                plan,
+                v1.position,
                 value[1].GetPosition(),
                 value[0].GetNetCode(),
                 layer_table_rev.get("B.Cu"),
             )
 
-    pcb.Save("StudioClock.kicad_pcb")
+    # drop duplicate tracks (e.g. the closing segment of the rings) and merge collinear
+    # chains, the copper stays the same
+    profiling.phase("track merging")
+    return plan.merged(), placements
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Place the modules and route the studio clock board."
+    )
+    parser.add_argument(
+        "--params", help="TOML or JSON file of generate_board() parameters"
+    )
+    parser.add_argument("--input", default="StudioClock.kicad_pcb")
+    parser.add_argument("--output", help="board to write, default the input board")
+    parser.add_argument(
+        "--netlist", help="netlist (.net) to group the modules by, e.g. StudioClock.net"
+    )
+    parser.add_argument(
+        "--backend",
+        choices=("pcbnew", "sexpr"),
+        default="pcbnew",
+        help="pcbnew, or sexpr to read and stream the board file without pcbnew",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only regenerate nets whose pads or routing changed since the last run",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="compute the routing plan without pcbnew and do not save the board",
+    )
+    parser.add_argument(
+        "--quiet", action="store_true", help="only log warnings and errors"
+    )
+    parser.add_argument(
+        "--verbose", action="store_true", help="log every placed module and net"
+    )
+    parser.add_argument(
+        "--profile-report",
+        metavar="JSON",
+        help="write the wall time and call counts of every phase to this file",
+    )
+    parser.add_argument(
+        "--cache-dir", help="reuse boards generated before (board_cache)"
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="regenerate whenever the parameters, the board or the netlist change",
+    )
+    args = parser.parse_args()
+    level = logging.INFO
+    if args.quiet:
+        level = logging.WARNING
+    elif args.verbose:
+        level = logging.DEBUG
+    logging.basicConfig(format="%(levelname)s %(name)s: %(message)s", level=level)
+    output = args.output or args.input
+    # the dry run only needs the board content, it is read without pcbnew
+    backend = "sexpr" if args.dry_run else args.backend
+
+    if args.watch:
+        import watch_StudioClock
+
+        watcher = watch_StudioClock.Watcher(
+            args.input,
+            output,
+            args.params,
+            args.netlist or os.path.splitext(args.input)[0] + ".net",
+            backend,
+        )
+        with contextlib.suppress(KeyboardInterrupt):
+            watcher.run()
+        sys.exit(0)
+
+    parameters = load_parameters(args.params) if args.params else {}
+    if args.netlist:
+        parameters["netlist"] = args.netlist
+    if args.profile_report:
+        profiling.enable(backend)
+    start = time.perf_counter()
+    cache = key = plan = None
+    if args.cache_dir and not args.dry_run:
+        import board_cache
+
+        profiling.phase("cache lookup")
+        cache = board_cache.BoardCache(args.cache_dir)
+        key = cache.key(args.input, parameters, backend)
+        plan = cache.fetch(key, output)
+    cached = plan is not None
+    if cached:
+        log.info("board %s taken from the cache", key[:12])
+    else:
+        profiling.phase("load")
+        pcb = load_board(args.input, backend)
+        plan, placements = generate_board(pcb, **parameters)
+        if not args.dry_run:
+            save_board(
+                pcb, plan, placements, output, backend, incremental=args.incremental
+            )
+        if cache:
+            profiling.phase("cache store")
+            cache.store(key, output, plan)
+    profiling.end_phase()
+    # one compact record per run, the fields are also attached to the log record
+    summary = dict(
+        input=args.input,
+        output=None if args.dry_run else output,
+        backend=backend,
+        cached=cached,
+        tracks=len(plan.segments),
+        vias=len(plan.vias),
+        track_length_mm=round(plan.total_track_length() / clock_geometry.IU_PER_MM, 3),
+        runtime_s=round(time.perf_counter() - start, 4),
+    )
+    log.info("summary %s", json.dumps(summary), extra={"summary": summary})
+    if args.profile_report:
+        profiling.PROFILER.write_report(args.profile_report)
@@ -0,0 +1,100 @@
+"""Per net fingerprints for incremental regeneration.
+
+The fingerprint of a net covers the positions of its pads and everything the routing
+derived for it from the parameters (radius, layers, widths), i.e. its rows of the
+routing plan. Nets are only deleted and regenerated on the board when their fingerprint
+changed. The fingerprints are stored in a sidecar file next to the saved board together
+with a hash of that board, so a board edited in the meantime is regenerated completely.
+"""
+
+import collections
+import hashlib
+import json
+import os
+
+DRAWINGS_KEY = "<drawings>"
+
+
+def sidecar_path(board_path):
+    """Get the name of the fingerprint file of a board.
+
+    :param str board_path: .kicad_pcb file
+    :return str:
+    """
+    return f"{board_path}.fingerprints.json"
+
+
+def _file_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def fingerprint_nets(plan, pads):
+    """Calculate the fingerprint of every net and of the board drawings.
+
+    :param routing_plan.RoutingPlan plan: generated routing
+    :param pads: all pads of the board (pcbnew or kicad_pcb_parser pads)
+    :return tuple of dict: (net short name -> fingerprint, net short name -> net code)
+    """
+    net_codes = {}
+    pad_inputs = collections.defaultdict(list)
+    for pad in pads:
+        position = pad.GetPosition()
+        net_codes[pad.GetShortNetname()] = pad.GetNetCode()
+        pad_inputs[pad.GetNetCode()].append(
+            (
+                pad.GetParent().GetReference(),
+                pad.GetPadName(),
+                int(position[0]),
+                int(position[1]),
+            )
+        )
+    segments = plan.segments
+    vias = plan.vias
+    fingerprints = {}
+    for name, net_code in net_codes.items():
+        fingerprint = hashlib.sha1(repr(sorted(pad_inputs[net_code])).encode())
+        fingerprint.update(segments[segments[:, 4] == net_code].tobytes())
+        fingerprint.update(vias[vias[:, 2] == net_code].tobytes())
+        fingerprints[name] = fingerprint.hexdigest()
+    fingerprints[DRAWINGS_KEY] = hashlib.sha1(plan.drawings.tobytes()).hexdigest()
+    return fingerprints, net_codes
+
+
+def changed_nets(previous, fingerprints):
+    """Get the nets which have to be regenerated.
+
+    :param dict previous: fingerprints of the existing board
+    :param dict fingerprints: fingerprints of the new routing
+    :return set of str: net short names (and DRAWINGS_KEY)
+    """
+    return {name for name, value in fingerprints.items() if previous.get(name) != value}
+
+
+def load_fingerprints(board_path):
+    """Load the fingerprints of a board.
+
+    :param str board_path: .kicad_pcb file
+    :return dict: empty if there is no sidecar file or the board changed since
+    """
+    try:
+        with open(sidecar_path(board_path)) as f:
+            stored = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if stored.get("board") != _file_hash(board_path):
+        return {}
+    return stored["nets"]
+
+
+def save_fingerprints(board_path, fingerprints):
+    """Store the fingerprints of a saved board in its sidecar file.
+
+    :param str board_path: .kicad_pcb file (already saved)
+    :param dict fingerprints: as returned by fingerprint_nets()
+    :return None:
+    """
+    tmp_path = f"{sidecar_path(board_path)}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"board": _file_hash(board_path), "nets": fingerprints}, f, indent=1)
+    os.replace(tmp_path, sidecar_path(board_path))
@@ -0,0 +1,198 @@
+"""Opt-in wall time and call count report of a clock generation.
+
+The generator marks the start of its phases with :func:`phase` and counts calls of
+its helpers with :func:`count`. Both are no-ops until :func:`enable` is called, so
+the normal run pays one attribute check per call. While enabled, the methods of the
+board classes (pcbnew or kicad_pcb_parser) are wrapped to count the board API calls
+of every phase. The report is written as JSON::
+
+    {"total_s": ..., "phases": [{"name": "load", "wall_s": ..., "calls": {...},
+    "counts": {...}}, ...], "meta": {...}}
+"""
+
+import collections
+import functools
+import inspect
+import json
+import os
+import platform
+import time
+
+#: board API classes whose method calls are counted (missing ones are skipped)
+PCBNEW_CLASSES = (
+    "BOARD",
+    "MODULE",
+    "D_PAD",
+    "TRACK",
+    "VIA",
+    "DRAWSEGMENT",
+    "NETINFO_ITEM",
+)
+PARSER_CLASSES = ("KicadPcb", "Module", "Pad", "Net")
+
+_MISSING = object()  # marks inherited methods in Profiler._patched
+
+
+class Profiler:
+    """Wall time, board API calls and helper calls per phase.
+
+    Phases follow each other, a new phase ends the current one. Phases entered more
+    than once (e.g. several boards of a sweep) are summed up.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.meta = {}
+        self.phases = {}  # name -> {"wall_s", "calls", "counts"}
+        self._current = None
+        self._start = None
+        self._patched = []  # (class, name, original method)
+
+    def _phase_record(self, name):
+        if name not in self.phases:
+            self.phases[name] = {
+                "wall_s": 0.0,
+                "calls": collections.Counter(),
+                "counts": collections.Counter(),
+            }
+        return self.phases[name]
+
+    def phase(self, name):
+        """End the current phase and start the next one.
+
+        :param str name:
+        :return None:
+        """
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        if self._current is not None:
+            self.phases[self._current]["wall_s"] += now - self._start
+        self._phase_record(name)
+        self._current = name
+        self._start = now
+
+    def end_phase(self):
+        """End the current phase, the time until the next phase is not accounted."""
+        if not self.enabled or self._current is None:
+            return
+        self.phases[self._current]["wall_s"] += time.perf_counter() - self._start
+        self._current = None
+
+    def count(self, name, number=1):
+        """Count calls of a helper in the current phase.
+
+        :param str name:
+        :param int number:
+        :return None:
+        """
+        if self.enabled:
+            self._phase_record(self._current or "<none>")["counts"][name] += number
+
+    def _count_call(self, name):
+        self._phase_record(self._current or "<none>")["calls"][name] += 1
+
+    def instrument(self, module, class_names):
+        """Count the calls of the public methods of some classes of a module.
+
+        Inherited methods (e.g. the setters of pcbnew.BOARD_ITEM) are counted as
+        methods of the class they are called on.
+
+        :param module: e.g. pcbnew or kicad_pcb_parser
+        :param class_names: names of the classes, missing classes are skipped
+        :return None:
+        """
+        for class_name in class_names:
+            cls = getattr(module, class_name, None)
+            if cls is None:
+                continue
+            seen = set()
+            for base in cls.__mro__:
+                for name, method in list(vars(base).items()):
+                    if name in seen:
+                        continue  # overridden by a class before in the MRO
+                    seen.add(name)
+                    if name.startswith("_") or not inspect.isfunction(method):
+                        continue
+                    method = getattr(method, "_counted", method)
+                    self._patched.append((cls, name, vars(cls).get(name, _MISSING)))
+                    setattr(cls, name, self._counting(f"{class_name}.{name}", method))
+
+    def _counting(self, name, method):
+        @functools.wraps(method)
+        def counting(*args, **kwargs):
+            if self.enabled:
+                self._count_call(name)
+            return method(*args, **kwargs)
+
+        counting._counted = method  # a base class may be instrumented as well
+        return counting
+
+    def restore(self):
+        """Remove the counting wrappers of :meth:`instrument`."""
+        for cls, name, method in reversed(self._patched):
+            if method is _MISSING:
+                delattr(cls, name)  # inherited again
+            else:
+                setattr(cls, name, method)
+        self._patched = []
+
+    def report(self):
+        """Get the report.
+
+        :return dict:
+        """
+        phases = [
+            {
+                "name": name,
+                "wall_s": round(record["wall_s"], 6),
+                "calls": dict(sorted(record["calls"].items())),
+                "counts": dict(sorted(record["counts"].items())),
+            }
+            for name, record in self.phases.items()
+        ]
+        return {
+            "total_s": round(sum(phase["wall_s"] for phase in phases), 6),
+            "phases": phases,
+            "meta": self.meta,
+        }
+
+    def write_report(self, path):
+        """Write the report as JSON.
+
+        :param str path:
+        :return None:
+        """
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.report(), f, indent=1)
+        os.replace(tmp_path, path)
+
+
+#: profiler of the generator, disabled by default
+PROFILER = Profiler()
+phase = PROFILER.phase
+end_phase = PROFILER.end_phase
+count = PROFILER.count
+
+
+def enable(backend="pcbnew"):
+    """Enable the profiler and count the board API calls of the backend.
+
+    :param str backend: "pcbnew" or "sexpr"
+    :return Profiler:
+    """
+    if backend == "sexpr":
+        import kicad_pcb_parser
+
+        PROFILER.instrument(kicad_pcb_parser, PARSER_CLASSES)
+    else:
+        import pcbnew
+
+        PROFILER.instrument(pcbnew, PCBNEW_CLASSES)
+        if hasattr(pcbnew, "GetBuildVersion"):
+            PROFILER.meta["kicad_version"] = pcbnew.GetBuildVersion()
+    PROFILER.meta["backend"] = backend
+    PROFILER.meta["python_version"] = platform.python_version()
+    PROFILER.enabled = True
+    return PROFILER
@@ -0,0 +1,494 @@
+"""Routing plan: a compact record of the generated copper, independent of pcbnew.
+
+The routing functions append segments, vias and drawings to a :class:`RoutingPlan`,
+which stores them in flat int64 arrays (nm). Only :func:`commit_plan` talks to pcbnew
+and turns the whole plan into board objects in one tight loop.
+"""
+
+import array
+import collections
+import math
+
+import numpy as np
+
+import profiling
+from clock_geometry import IU_PER_MM
+
+TRACK_WIDTH = 300000
+VIA_WIDTH = 300000
+VIA_DRILL = 200000
+DRAWING_WIDTH = 100000
+
+Point = collections.namedtuple("Point", "x y")
+Segment = collections.namedtuple("Segment", "start end net_code layer width")
+Via = collections.namedtuple("Via", "position net_code width drill")
+Drawing = collections.namedtuple("Drawing", "start end layer width")
+
+
+def point_mm(x, y):
+    """Create a point from millimetres, truncating like ``pcbnew.wxPointMM``.
+
+    :param float x:
+    :param float y:
+    :return Point:
+    """
+    return Point(int(x * IU_PER_MM), int(y * IU_PER_MM))
+
+
+def offset_mm(location, dx=0, dy=0):
+    """Move a point by a distance in millimetres.
+
+    Only the distance is converted (rounded to the nearest nm, so a distance like
+    3 * 1.4 mm does not lose a nanometre), the coordinates stay integer nanometres and
+    e.g. a point moved vertically keeps exactly its x.
+
+    :param location: anything with an x and y item (pcbnew.wxPoint, tuple, Point)
+    :param float dx:
+    :param float dy:
+    :return Point:
+    """
+    return Point(
+        int(location[0]) + round(dx * IU_PER_MM),
+        int(location[1]) + round(dy * IU_PER_MM),
+    )
+
+
+def distance_mm(location):
+    """Get the distance of a point (nm) from the origin in millimetres.
+
+    :param location: anything with an x and y item (pcbnew.wxPoint, tuple, Point)
+    :return float:
+    """
+    return math.hypot(int(location[0]), int(location[1])) / IU_PER_MM
+
+
+def as_point(location):
+    """Convert anything with an x and y item (pcbnew.wxPoint, tuple, Point) to a Point.
+
+    :param location:
+    :return Point:
+    """
+    return Point(int(location[0]), int(location[1]))
+
+
+class RoutingPlan:
+    """Array backed list of segments, vias and drawings.
+
+    Every object is stored as one row of int64 values, the columns are given by
+    ``SEGMENT_FIELDS``, ``VIA_FIELDS`` and ``DRAWING_FIELDS``. The rows of segments and
+    vias are indexed by net code, so the objects of one net are found in O(result).
+
+    The placed pads the plan was routed for (board_snapshot records) are kept as
+    ``pads``, so saving and checking the plan do not read them from the board again.
+    Plans loaded from a file have no pads (None).
+
+    :param dict layer_table_rev: layer name to layer number
+    """
+
+    SEGMENT_FIELDS = (
+        "start_x",
+        "start_y",
+        "end_x",
+        "end_y",
+        "net_code",
+        "layer",
+        "width",
+    )
+    VIA_FIELDS = ("x", "y", "net_code", "width", "drill")
+    DRAWING_FIELDS = ("start_x", "start_y", "end_x", "end_y", "layer", "width")
+
+    def __init__(self, layer_table_rev):
+        self.layer_table_rev = dict(layer_table_rev)
+        self.pads = None
+        self._segments = array.array("q")
+        self._vias = array.array("q")
+        self._drawings = array.array("q")
+        self._segments_by_net = collections.defaultdict(list)  # net code -> rows
+        self._vias_by_net = collections.defaultdict(list)
+
+    def layer(self, name):
+        """Get the layer number of a layer name.
+
+        :param str name: e.g. "F.Cu"
+        :return int:
+        """
+        return self.layer_table_rev[name]
+
+    def add_segment(self, start, end, net_code, layer, width=TRACK_WIDTH):
+        """Append a track segment.
+
+        :param start: start location (nm)
+        :param end: end location (nm)
+        :param int net_code: id of net as returned by GetNetCode()
+        :param int layer: integer code of layer on pcb
+        :param int width: track width (nm)
+        :return Segment: the appended segment
+        """
+        segment = Segment(as_point(start), as_point(end), net_code, layer, width)
+        self._segments_by_net[net_code].append(
+            len(self._segments) // len(self.SEGMENT_FIELDS)
+        )
+        self._segments.extend((*segment.start, *segment.end, net_code, layer, width))
+        return segment
+
+    def add_polyline(self, vertices, net_code, layer, width=TRACK_WIDTH):
+        """Append one track segment between every two consecutive vertices.
+
+        The rows are appended in one step, e.g. a whole polygon ring.
+
+        :param numpy.ndarray vertices: int64 array of shape (n, 2), locations (nm)
+        :param int net_code: id of net as returned by GetNetCode()
+        :param int layer: integer code of layer on pcb
+        :param int width: track width (nm)
+        :return tuple of Segment: first and last appended segment, None if n < 2
+        """
+        vertices = np.asarray(vertices, dtype=np.int64)
+        count = len(vertices) - 1
+        if count < 1:
+            return None, None
+        rows = np.empty((count, len(self.SEGMENT_FIELDS)), dtype=np.int64)
+        rows[:, 0:2] = vertices[:-1]
+        rows[:, 2:4] = vertices[1:]
+        rows[:, 4:] = net_code, layer, width
+        first = len(self._segments) // len(self.SEGMENT_FIELDS)
+        self._segments_by_net[net_code].extend(range(first, first + count))
+        self._segments.frombytes(rows.tobytes())
+        first_row, last_row = rows[0].tolist(), rows[-1].tolist()
+        return (
+            Segment(Point(*first_row[0:2]), Point(*first_row[2:4]), *first_row[4:]),
+            Segment(Point(*last_row[0:2]), Point(*last_row[2:4]), *last_row[4:]),
+        )
+
+    def add_via(self, position, net_code, width=VIA_WIDTH, drill=VIA_DRILL):
+        """Append a through via from F.Cu to B.Cu.
+
+        :param position: location (nm)
+        :param int net_code: id of net as returned by GetNetCode()
+        :param int width: via diameter (nm)
+        :param int drill: drill diameter (nm)
+        :return Via: the appended via
+        """
+        via = Via(as_point(position), net_code, width, drill)
+        self._vias_by_net[net_code].append(len(self._vias) // len(self.VIA_FIELDS))
+        self._vias.extend((*via.position, net_code, width, drill))
+        return via
+
+    def add_drawing(self, start, end, layer, width=DRAWING_WIDTH):
+        """Append a graphic line (e.g. the board outline on Edge.Cuts).
+
+        :param start: start location (nm)
+        :param end: end location (nm)
+        :param int layer: integer code of layer on pcb
+        :param int width: line width (nm)
+        :return Drawing: the appended drawing
+        """
+        drawing = Drawing(as_point(start), as_point(end), layer, width)
+        self._drawings.extend((*drawing.start, *drawing.end, layer, width))
+        return drawing
+
+    @staticmethod
+    def _as_array(values, fields):
+        return np.frombuffer(values, dtype=np.int64).reshape(-1, len(fields)).copy()
+
+    @property
+    def segments(self):
+        """Copy of all segments as int64 array, one row per segment."""
+        return self._as_array(self._segments, self.SEGMENT_FIELDS)
+
+    @property
+    def vias(self):
+        """Copy of all vias as int64 array, one row per via."""
+        return self._as_array(self._vias, self.VIA_FIELDS)
+
+    @property
+    def drawings(self):
+        """Copy of all drawings as int64 array, one row per drawing."""
+        return self._as_array(self._drawings, self.DRAWING_FIELDS)
+
+    def iter_segments(self):
+        """Iterate over all segments in the order they were added.
+
+        :return iterator of Segment:
+        """
+        for x0, y0, x1, y1, net_code, layer, width in self.segments.tolist():
+            yield Segment(Point(x0, y0), Point(x1, y1), net_code, layer, width)
+
+    def iter_vias(self):
+        """Iterate over all vias in the order they were added.
+
+        :return iterator of Via:
+        """
+        for x, y, net_code, width, drill in self.vias.tolist():
+            yield Via(Point(x, y), net_code, width, drill)
+
+    def iter_drawings(self):
+        """Iterate over all drawings in the order they were added.
+
+        :return iterator of Drawing:
+        """
+        for x0, y0, x1, y1, layer, width in self.drawings.tolist():
+            yield Drawing(Point(x0, y0), Point(x1, y1), layer, width)
+
+    def _set_rows(self, segments, vias, drawings):
+        """Replace all objects by the rows of int64 arrays and rebuild the net index."""
+        self._segments = array.array("q", np.asarray(segments, np.int64).tobytes())
+        self._vias = array.array("q", np.asarray(vias, np.int64).tobytes())
+        self._drawings = array.array("q", np.asarray(drawings, np.int64).tobytes())
+        self._segments_by_net.clear()
+        self._vias_by_net.clear()
+        for row, net_code in enumerate(self._segments[4 :: len(self.SEGMENT_FIELDS)]):
+            self._segments_by_net[net_code].append(row)
+        for row, net_code in enumerate(self._vias[2 :: len(self.VIA_FIELDS)]):
+            self._vias_by_net[net_code].append(row)
+
+    def segments_on_net(self, net_code):
+        """Get the segments of one net in the order they were added.
+
+        :param int net_code:
+        :return list of Segment:
+        """
+        size = len(self.SEGMENT_FIELDS)
+        segments = []
+        for row in self._segments_by_net.get(net_code, ()):
+            x0, y0, x1, y1, _, layer, width = self._segments[
+                row * size : row * size + size
+            ]
+            segments.append(
+                Segment(Point(x0, y0), Point(x1, y1), net_code, layer, width)
+            )
+        return segments
+
+    def vias_on_net(self, net_code):
+        """Get the vias of one net in the order they were added.
+
+        :param int net_code:
+        :return list of Via:
+        """
+        size = len(self.VIA_FIELDS)
+        vias = []
+        for row in self._vias_by_net.get(net_code, ()):
+            x, y, _, width, drill = self._vias[row * size : row * size + size]
+            vias.append(Via(Point(x, y), net_code, width, drill))
+        return vias
+
+    def net_codes(self):
+        """Get the codes of all nets with segments or vias.
+
+        :return set of int:
+        """
+        return set(self._segments_by_net) | set(self._vias_by_net)
+
+    def subset(self, net_codes, drawings=True):
+        """Get a new plan with the segments and vias of some nets only.
+
+        :param net_codes: nets to keep
+        :param bool drawings: keep the drawings too
+        :return RoutingPlan:
+        """
+        codes = np.fromiter(net_codes, dtype=np.int64)
+        segments = self.segments
+        vias = self.vias
+        plan = RoutingPlan(self.layer_table_rev)
+        plan._set_rows(
+            segments[np.isin(segments[:, 4], codes)],
+            vias[np.isin(vias[:, 2], codes)],
+            self.drawings if drawings else (),
+        )
+        plan.pads = self.pads
+        return plan
+
+    def total_track_length(self):
+        """Sum of the lengths of all segments.
+
+        :return float: length in nm
+        """
+        segments = self.segments
+        return float(
+            np.hypot(
+                segments[:, 2] - segments[:, 0], segments[:, 3] - segments[:, 1]
+            ).sum()
+        )
+
+    def merged(self):
+        """Get a new plan with fewer segments but the same copper.
+
+        Zero length segments and duplicates (also reversed ones) are dropped, chains
+        of collinear segments of the same net, layer and width meeting end to end
+        (and no other segment of the group) are merged into one segment. Vias and
+        tracks ending on a merge point still lie on the merged segment.
+
+        :return RoutingPlan:
+        """
+        segments = self.segments
+        segments = segments[
+            (segments[:, 0] != segments[:, 2]) | (segments[:, 1] != segments[:, 3])
+        ]
+        # duplicates: same row after ordering the end points, keep the first one
+        flip = (segments[:, 0] > segments[:, 2]) | (
+            (segments[:, 0] == segments[:, 2]) & (segments[:, 1] > segments[:, 3])
+        )
+        normalized = segments.copy()
+        normalized[flip, :4] = segments[flip][:, [2, 3, 0, 1]]
+        _, first = np.unique(normalized, axis=0, return_index=True)
+        segments = segments[np.sort(first)]
+
+        plan = RoutingPlan(self.layer_table_rev)
+        plan._set_rows(_merge_collinear(segments.tolist()), self.vias, self.drawings)
+        plan.pads = self.pads
+        return plan
+
+    def __eq__(self, other):
+        if not isinstance(other, RoutingPlan):
+            return NotImplemented
+        return (
+            self.layer_table_rev == other.layer_table_rev
+            and self._segments == other._segments
+            and self._vias == other._vias
+            and self._drawings == other._drawings
+        )
+
+    def validate(self):
+        """Check the plan for objects pcbnew would not accept.
+
+        :return list of str: description of every problem, empty if the plan is valid
+        """
+        problems = []
+        layers = set(self.layer_table_rev.values())
+        for i, segment in enumerate(self.iter_segments()):
+            if segment.layer not in layers:
+                problems.append(f"segment {i} on unknown layer {segment.layer}")
+            if segment.width <= 0:
+                problems.append(f"segment {i} with width {segment.width}")
+        for i, via in enumerate(self.iter_vias()):
+            if not 0 < via.drill < via.width:
+                problems.append(f"via {i} with drill {via.drill} >= width {via.width}")
+        return problems
+
+    def save(self, path):
+        """Serialize the plan to a numpy ``.npz`` file.
+
+        :param path: file name or file object
+        :return None:
+        """
+        names = list(self.layer_table_rev)
+        np.savez(
+            path,
+            segments=self.segments,
+            vias=self.vias,
+            drawings=self.drawings,
+            layer_names=np.array(names, dtype=str),
+            layer_numbers=np.array([self.layer_table_rev[n] for n in names]),
+        )
+
+    @classmethod
+    def load(cls, path):
+        """Load a plan saved with :meth:`save`.
+
+        :param path: file name or file object
+        :return RoutingPlan:
+        """
+        with np.load(path) as data:
+            plan = cls(
+                zip(data["layer_names"].tolist(), data["layer_numbers"].tolist())
+            )
+            plan._set_rows(data["segments"], data["vias"], data["drawings"])
+        return plan
+
+
+def _merge_collinear(rows):
+    """Merge collinear segment rows meeting end to end (in place, keeps the order).
+
+    :param list rows: segment rows as lists, without duplicates and zero length ones
+    :return list: merged rows
+    """
+    ends = collections.defaultdict(list)  # (net, layer, width, x, y) -> row indices
+    for index, (x0, y0, x1, y1, *group) in enumerate(rows):
+        ends[(*group, x0, y0)].append(index)
+        ends[(*group, x1, y1)].append(index)
+    alive = [True] * len(rows)
+    for (*_, x, y), indices in ends.items():
+        if len(indices) != 2:
+            continue
+        first, second = indices
+        if first == second:
+            continue
+        row_a, row_b = rows[first], rows[second]
+        a_start = (row_a[0], row_a[1]) == (x, y)
+        b_start = (row_b[0], row_b[1]) == (x, y)
+        ax, ay = row_a[2:4] if a_start else row_a[0:2]
+        bx, by = row_b[2:4] if b_start else row_b[0:2]
+        cross = (x - ax) * (by - y) - (y - ay) * (bx - x)
+        dot = (x - ax) * (bx - x) + (y - ay) * (by - y)
+        if cross != 0 or dot <= 0:
+            continue
+        # extend the first segment over the point, the second one disappears
+        if a_start:
+            row_a[0:2] = bx, by
+        else:
+            row_a[2:4] = bx, by
+        alive[second] = False
+        far_end = ends[(*row_b[4:], bx, by)]
+        far_end[far_end.index(second)] = first
+    return [row for row, keep in zip(rows, alive) if keep]
+
+
+def commit_plan(plan, pcb, old_tracks=()):
+    """Create the pcbnew objects of a plan on a board.
+
+    The old tracks and vias are reused for the new ones (moved, resized and assigned
+    to the new net) instead of being deleted and allocated again, only the surplus
+    is deleted (profiled as "delete" phase, the rest as "save" phase). With an
+    unchanged number of objects nothing is deleted or allocated.
+
+    :param RoutingPlan plan:
+    :param pcbnew.BOARD pcb:
+    :param old_tracks: tracks and vias of the board the plan replaces
+    :return int: number of reused tracks and vias
+    """
+    import pcbnew
+
+    old_segments = []
+    old_vias = []
+    for track in old_tracks:
+        (old_vias if track.Type() == pcbnew.PCB_VIA_T else old_segments).append(track)
+    reused = min(len(old_segments), len(plan.segments)) + min(
+        len(old_vias), len(plan.vias)
+    )
+    wx_point = pcbnew.wxPoint
+    layer_pair = plan.layer("F.Cu"), plan.layer("B.Cu")
+    for x0, y0, x1, y1, net_code, layer, width in plan.segments.tolist():
+        if old_segments:
+            track = old_segments.pop()
+        else:
+            track = pcbnew.TRACK(pcb)
+            pcb.Add(track)
+        track.SetStart(wx_point(x0, y0))
+        track.SetEnd(wx_point(x1, y1))
+        track.SetNetCode(net_code)
+        track.SetLayer(layer)
+        track.SetWidth(width)
+    for x, y, net_code, width, drill in plan.vias.tolist():
+        if old_vias:
+            via = old_vias.pop()
+        else:
+            via = pcbnew.VIA(pcb)
+            pcb.Add(via)
+        via.SetPosition(wx_point(x, y))
+        via.SetWidth(width)
+        via.SetDrill(drill)
+        via.SetViaType(pcbnew.VIA_THROUGH)
+        via.SetLayerPair(*layer_pair)
+        via.SetNetCode(net_code)
+    if old_segments or old_vias:
+        profiling.phase("delete")
+        for track in old_segments + old_vias:
+            pcb.Delete(track)
+        profiling.phase("save")
+    for x0, y0, x1, y1, layer, width in plan.drawings.tolist():
+        drawing = pcbnew.DRAWSEGMENT(pcb)
+        pcb.Add(drawing)
+        drawing.SetStart(wx_point(x0, y0))
+        drawing.SetEnd(wx_point(x1, y1))
+        drawing.SetLayer(layer)
+        drawing.SetWidth(width)
+    return reused
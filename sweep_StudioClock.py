@@ -0,0 +1,255 @@
+"""Generate one clock board per combination of a parameter grid.
+
+Example::
+
+    python sweep_StudioClock.py --Radius 40 42 44 --digit_space 2 3 --output-dir sweep
+
+The variants are spread over a process pool (one worker per core by default), the number
+of workers bounds the memory. Where processes can fork, the template board is loaded and
+its modules and pads are decoded once in this process, the workers inherit the decoded
+board copy-on-write and do not load the template at all. Otherwise (or with
+``--no-fork``) every worker loads the template board on first use. Every worker
+generates its share of the variants on its own board instance. A summary table
+``summary.csv`` with the track count, via count, total track length, number of clearance
+violations and open nets and runtime of every variant is written next to the boards.
+With ``--cache-dir`` boards generated before (same template content, parameters and
+generator) are copied from a board_cache. ``--contact-sheet`` draws a preview of every
+variant (from the generated geometry, see board_preview) into one PNG file.
+"""
+
+import argparse
+import concurrent.futures
+import csv
+import itertools
+import multiprocessing
+import os
+import time
+
+import board_cache
+import board_checks
+import board_preview
+import kicad_pcb_parser
+import make_StudioClock
+from clock_geometry import IU_PER_MM
+
+#: parameters of make_StudioClock.generate_board() that can be swept and their type
+SWEEP_PARAMETERS = {
+    "Radius": float,
+    "radius_hours": float,
+    "digit_space": float,
+    "digit_orientation": int,
+    "pcb_dimension_length": float,
+}
+#: edge length (pixels) of the previews on the contact sheet
+THUMBNAIL_SIZE = 160
+RESULT_FIELDS = (
+    "tracks",
+    "vias",
+    "track_length_mm",
+    "clearance_violations",
+    "open_nets",
+    "runtime_s",
+    "output",
+)
+
+_board = None  # board instance of the worker process, loaded on first use
+_template_path = None
+_cache = None
+
+
+def _init_worker(template_path, backend, cache_dir=None):
+    global _board, _template_path, _cache
+    _board = None
+    _template_path = template_path
+    _cache = board_cache.BoardCache(cache_dir) if cache_dir else None
+
+
+def _worker_board(backend):
+    global _board
+    if _board is None:
+        _board = make_StudioClock.load_board(_template_path, backend)
+    return _board
+
+
+def _fork_context():
+    """Get the fork start method, None where processes cannot fork (e.g. Windows)."""
+    if "fork" not in multiprocessing.get_all_start_methods():
+        return None
+    return multiprocessing.get_context("fork")
+
+
+def generate_variant(variant, parameters, output_path, backend, thumbnail_size=None):
+    """Generate and save one variant on the board of the worker process.
+
+    :param int variant: number of the variant
+    :param dict parameters: keyword arguments of make_StudioClock.generate_board()
+    :param str output_path: .kicad_pcb file to write
+    :param str backend: "pcbnew" or "sexpr"
+    :param int thumbnail_size: edge length (pixels) of a preview, None draws none
+    :return dict: one row of the summary table, with the preview raster as
+        "thumbnail" if drawn
+    """
+    start = time.perf_counter()
+    plan = None
+    if _cache:
+        key = _cache.key(_template_path, parameters, backend)
+        plan = _cache.fetch(key, output_path)
+    if plan is None:
+        board = _worker_board(backend)
+        plan, placements = make_StudioClock.generate_board(board, **parameters)
+        make_StudioClock.save_board(board, plan, placements, output_path, backend)
+        if _cache:
+            _cache.store(key, output_path, plan)
+        pads = plan.pads
+    else:
+        with kicad_pcb_parser.load_board(output_path) as saved:
+            pads = saved.GetPads()
+    row = dict(
+        variant=variant,
+        **parameters,
+        tracks=len(plan.segments),
+        vias=len(plan.vias),
+        track_length_mm=round(plan.total_track_length() / IU_PER_MM, 3),
+        clearance_violations=len(board_checks.check_clearance(plan)),
+        open_nets=len(
+            board_checks.check_connectivity(plan, board_checks.group_pads_by_net(pads))
+        ),
+        runtime_s=round(time.perf_counter() - start, 4),
+        output=output_path,
+    )
+    if thumbnail_size:
+        row["thumbnail"] = board_preview.render_raster(plan, pads, thumbnail_size)
+    return row
+
+
+def parameter_grid(grid):
+    """Iterate over all combinations of a parameter grid.
+
+    :param dict grid: parameter name -> list of values
+    :return iterator of dict: parameter name -> value
+    """
+    for values in itertools.product(*grid.values()):
+        yield dict(zip(grid, values))
+
+
+def write_summary(rows, path, parameter_names):
+    """Write the summary table of a sweep as CSV.
+
+    :param list rows: results of generate_variant()
+    :param str path: .csv file to write
+    :param parameter_names: swept parameters (columns)
+    :return None:
+    """
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(
+            f, ("variant", *parameter_names, *RESULT_FIELDS), restval=""
+        )
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def sweep(
+    grid,
+    template_path,
+    output_dir,
+    backend="sexpr",
+    jobs=None,
+    cache_dir=None,
+    fork=True,
+    contact_sheet=None,
+):
+    """Generate one board per combination of the grid in parallel.
+
+    :param dict grid: parameter name -> list of values
+    :param str template_path: input .kicad_pcb file
+    :param str output_dir: directory for the boards and the summary
+    :param str backend: "pcbnew" or "sexpr"
+    :param int jobs: number of worker processes, default one per core
+    :param str cache_dir: directory of a board_cache.BoardCache, None disables it
+    :param bool fork: load the template in this process and fork the workers from it,
+        ignored where processes cannot fork
+    :param str contact_sheet: PNG file of a preview of every variant, None draws none
+    :return list of dict: summary table ordered by variant
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    context = _fork_context() if fork else None
+    if context is None:
+        executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=jobs,
+            initializer=_init_worker,
+            initargs=(template_path, backend, cache_dir),
+        )
+    else:
+        # the workers are forked on demand and inherit the loaded board, the modules
+        # and pads are decoded here (kicad_pcb_parser decodes them on first use)
+        _init_worker(template_path, backend, cache_dir)
+        _worker_board(backend).GetModules()
+        executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=jobs, mp_context=context
+        )
+    try:
+        with executor:
+            futures = [
+                executor.submit(
+                    generate_variant,
+                    variant,
+                    parameters,
+                    os.path.join(output_dir, f"StudioClock_{variant:04d}.kicad_pcb"),
+                    backend,
+                    THUMBNAIL_SIZE if contact_sheet else None,
+                )
+                for variant, parameters in enumerate(parameter_grid(grid))
+            ]
+            rows = [future.result() for future in futures]
+    finally:
+        if context is not None:
+            if hasattr(_board, "close"):
+                _board.close()  # file mapping of kicad_pcb_parser
+            _init_worker(None, backend)
+    if contact_sheet and rows:
+        thumbnails = [row.pop("thumbnail") for row in rows]
+        board_preview.write_png(board_preview.contact_sheet(thumbnails), contact_sheet)
+    write_summary(rows, os.path.join(output_dir, "summary.csv"), list(grid))
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    for name, type_ in SWEEP_PARAMETERS.items():
+        parser.add_argument(f"--{name}", type=type_, nargs="+", metavar="VALUE")
+    parser.add_argument("--input", default="StudioClock.kicad_pcb")
+    parser.add_argument("--output-dir", default="sweep")
+    parser.add_argument("--backend", choices=("pcbnew", "sexpr"), default="sexpr")
+    parser.add_argument("--jobs", type=int, default=None)
+    parser.add_argument("--cache-dir", help="reuse boards generated before")
+    parser.add_argument(
+        "--no-fork",
+        dest="fork",
+        action="store_false",
+        help="load the template in every worker instead of forking the workers",
+    )
+    parser.add_argument(
+        "--contact-sheet", metavar="PNG", help="draw a preview of every variant"
+    )
+    args = parser.parse_args()
+
+    grid = {
+        name: getattr(args, name)
+        for name in SWEEP_PARAMETERS
+        if getattr(args, name) is not None
+    }
+    start = time.perf_counter()
+    summary = sweep(
+        grid,
+        args.input,
+        args.output_dir,
+        args.backend,
+        args.jobs,
+        args.cache_dir,
+        args.fork,
+        args.contact_sheet,
+    )
+    print(
+        f"{len(summary)} variants in {time.perf_counter() - start:.2f} s, "
+        f"summary in {os.path.join(args.output_dir, 'summary.csv')}"
+    )
@@ -0,0 +1,164 @@
+"""Regenerate the clock board whenever its parameters or its netlist change.
+
+Example::
+
+    python watch_StudioClock.py --params clock.json --output StudioClock_watch.kicad_pcb
+
+The board is loaded once and kept in memory together with its module and net
+indexes. The parameter file (TOML or JSON with make_StudioClock.generate_board()
+keyword arguments), the input board and the netlist are polled; a changed parameter
+file only regenerates the routing on the loaded board, a changed board or netlist
+reloads the board first. The nets are compared by their fingerprints with the last
+written board, the output is only rewritten if the routing of a net changed, and
+always atomically (written beside the output and renamed).
+"""
+
+import argparse
+import contextlib
+import logging
+import os
+import time
+
+import make_StudioClock
+import net_fingerprints
+
+log = logging.getLogger("watch_StudioClock")
+
+#: seconds between two polls of the watched files
+POLL_INTERVAL = 0.2
+
+
+def _stat(path):
+    """Get what identifies a version of a file, None if it is missing."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class Watcher:
+    """Keep a board in memory and regenerate it when the watched files change.
+
+    :param str input_path: input .kicad_pcb file
+    :param str output_path: .kicad_pcb file to write
+    :param str params_path: TOML or JSON parameter file, None uses the defaults
+    :param str netlist_path: netlist of the board, None does not watch it
+    :param str backend: "pcbnew" or "sexpr"
+    """
+
+    def __init__(
+        self,
+        input_path,
+        output_path,
+        params_path=None,
+        netlist_path=None,
+        backend="sexpr",
+    ):
+        self.input_path = input_path
+        self.output_path = output_path
+        self.params_path = params_path
+        self.netlist_path = netlist_path
+        self.backend = backend
+        self.board = None
+        self.parameters = {}
+        self.fingerprints = {}  # nets of the last written board
+        self._stats = {}
+
+    def _changed(self, *paths):
+        changed = False
+        for path in paths:
+            if path is not None and self._stats.get(path) != _stat(path):
+                self._stats[path] = _stat(path)
+                changed = True
+        return changed
+
+    def poll(self):
+        """Reload what changed since the last poll and regenerate the board.
+
+        :return set of str: regenerated nets (and net_fingerprints.DRAWINGS_KEY), None
+            if nothing changed or the update failed
+        """
+        reload = self._changed(self.input_path, self.netlist_path)
+        reparse = self._changed(self.params_path)
+        if not (reload or reparse):
+            return None
+        try:
+            if reparse and self.params_path is not None:
+                self.parameters = make_StudioClock.load_parameters(self.params_path)
+            if reload or self.board is None:
+                if hasattr(self.board, "close"):
+                    self.board.close()  # file mapping of kicad_pcb_parser
+                self.board = make_StudioClock.load_board(self.input_path, self.backend)
+            return self.regenerate()
+        except (OSError, TypeError, ValueError, ArithmeticError) as e:
+            # e.g. half written parameters or values the geometry cannot handle
+            log.warning("update failed, keeping the last board: %s", e)
+            return None
+
+    def regenerate(self):
+        """Route the board with the current parameters and write it if it changed.
+
+        :return set of str: changed nets (and net_fingerprints.DRAWINGS_KEY)
+        """
+        parameters = dict(self.parameters)
+        if self.netlist_path and os.path.exists(self.netlist_path):
+            parameters.setdefault("netlist", self.netlist_path)
+        plan, placements = make_StudioClock.generate_board(self.board, **parameters)
+        fingerprints, _ = net_fingerprints.fingerprint_nets(plan, plan.pads)
+        changed = net_fingerprints.changed_nets(self.fingerprints, fingerprints)
+        if changed:
+            tmp_path = f"{self.output_path}.watch.kicad_pcb"
+            make_StudioClock.save_board(
+                self.board, plan, placements, tmp_path, self.backend
+            )
+            os.replace(
+                net_fingerprints.sidecar_path(tmp_path),
+                net_fingerprints.sidecar_path(self.output_path),
+            )
+            os.replace(tmp_path, self.output_path)
+            self.fingerprints = fingerprints
+            # the output may be a watched file (e.g. written in place)
+            self._changed(self.input_path, self.netlist_path)
+        return changed
+
+    def run(self, interval=POLL_INTERVAL):
+        """Poll the watched files until interrupted (Ctrl+C).
+
+        :param float interval: seconds between two polls
+        :return None:
+        """
+        watched = [
+            p for p in (self.params_path, self.input_path, self.netlist_path) if p
+        ]
+        log.info("watching %s", ", ".join(watched))
+        while True:
+            start = time.perf_counter()
+            changed = self.poll()
+            if changed is not None:
+                log.info(
+                    "%d nets changed, %s %s in %.3f s",
+                    len(changed),
+                    self.output_path,
+                    "written" if changed else "unchanged",
+                    time.perf_counter() - start,
+                )
+            time.sleep(interval)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--params", help="TOML or JSON file of generate_board() parameters"
+    )
+    parser.add_argument("--input", default="StudioClock.kicad_pcb")
+    parser.add_argument("--output", default="StudioClock.kicad_pcb")
+    parser.add_argument("--netlist", default="StudioClock.net")
+    parser.add_argument("--backend", choices=("pcbnew", "sexpr"), default="sexpr")
+    parser.add_argument("--interval", type=float, default=POLL_INTERVAL)
+    args = parser.parse_args()
+    logging.basicConfig(format="%(levelname)s %(name)s: %(message)s", level="INFO")
+
+    watcher = Watcher(args.input, args.output, args.params, args.netlist, args.backend)
+    with contextlib.suppress(KeyboardInterrupt):
+        watcher.run(args.interval)